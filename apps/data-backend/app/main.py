@@ -1,18 +1,43 @@
 from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import time
 import uuid
-from .services.article_ingestion import ArticleIngestionService
+from .services.article_ingestion import ARTICLE_INGESTION_MAX_BATCH, ArticleIngestionService
 from .services.reader_ingestion import ReaderIngestionService
 from .services.digest import DigestService
-from .utils.logger import logger
+from .services.client_registry import client_registry
+from .services.embedding_cache import embedding_cache
+from .services.fuse_prompt import prompt_cache
+from .services.mongodb import mongo_connection
+from .utils.logger import logger, request_id_var, start_logging, stop_logging
+from .utils.metrics import HTTP_REQUEST_SECONDS, render_metrics
 
-app = FastAPI()
+def init_services(app: FastAPI) -> None:
+    """Build the services on app.state; importing this module builds none of them."""
+    app.state.article_service = ArticleIngestionService()
+    app.state.reader_service = ReaderIngestionService()
+    app.state.digest_service = DigestService()
 
-# Initialize services
-article_service = ArticleIngestionService()
-reader_service = ReaderIngestionService()
-digest_service = DigestService()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_logging()
+    # One MongoDB connection pool for the process, with the indexes in place before serving
+    await mongo_connection.open()
+    init_services(app)
+    # Preload prompts so request hot paths never block on a Langfuse fetch
+    await asyncio.to_thread(app.state.article_service.fuse_prompt_facade.warm_up)
+    yield
+    app.state.digest_service.close()
+    await client_registry.aclose()
+    mongo_connection.close()
+    # Flush records still queued for the log handlers
+    stop_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -27,20 +52,52 @@ app.add_middleware(
 async def add_request_id(request: Request, call_next):
     request_id = str(uuid.uuid4())
     request.state.request_id = request_id
-    logger.info(
-        "Request started",
-        extra={
-            'request_id': request_id,
-            'path': request.url.path
-        }
-    )
-    response = await call_next(request)
-    return response
+    # Log records of this request, including its background tasks, pick the ID up from here
+    token = request_id_var.set(request_id)
+    try:
+        logger.info(
+            "Request started",
+            extra={
+                'request_id': request_id,
+                'path': request.url.path
+            }
+        )
+        started = time.perf_counter()
+        # An exception escaping the app is answered with a 500 by the server
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Label by route template so path parameters do not create a series per value
+            route = request.scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                request.method,
+                route.path if route is not None else "unmatched",
+                status_code
+            ).observe(time.perf_counter() - started)
+    finally:
+        request_id_var.reset(token)
 
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Expose service metrics in the Prometheus text format."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """Return hit/miss counters of the in-process caches."""
+    return {
+        "prompts": prompt_cache.stats(),
+        "embeddings": embedding_cache.stats()
+    }
+
 @app.post("/api/ingest-article")
 async def ingest_article(request: Request):
     try:
@@ -52,7 +109,7 @@ async def ingest_article(request: Request):
                 'article_title': article_data.get('title', 'Unknown Title')
             }
         )
-        result = await article_service.process_article(article_data)
+        result = await request.app.state.article_service.process_article(article_data)
         logger.info(
             "Article processed successfully",
             extra={
@@ -71,6 +128,62 @@ async def ingest_article(request: Request):
         )
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/ingest-articles")
+async def ingest_articles(request: Request):
+    """
+    Ingest a batch of articles.
+
+    Expects a JSON list of articles and returns a list aligned with it, where each
+    item holds either the processed article under "result" or a message under "error".
+    At most ARTICLE_INGESTION_MAX_BATCH articles are accepted per request.
+    """
+    try:
+        articles_data = await request.json()
+    except json.JSONDecodeError as e:
+        logger.error(
+            "Invalid articles request body",
+            extra={
+                'request_id': request.state.request_id,
+                'error': str(e)
+            }
+        )
+        raise HTTPException(status_code=400, detail=f"Request body is not valid JSON: {e}")
+    if not isinstance(articles_data, list):
+        raise HTTPException(status_code=400, detail="Request body must be a list of articles")
+    if len(articles_data) > ARTICLE_INGESTION_MAX_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {ARTICLE_INGESTION_MAX_BATCH} articles can be ingested per request"
+        )
+
+    try:
+        logger.info(
+            "Processing articles request",
+            extra={
+                'request_id': request.state.request_id,
+                'total': len(articles_data)
+            }
+        )
+        results = await request.app.state.article_service.process_articles(articles_data)
+        logger.info(
+            "Articles processed",
+            extra={
+                'request_id': request.state.request_id,
+                'total': len(results),
+                'failed': sum(1 for item in results if item["error"] is not None)
+            }
+        )
+        return results
+    except Exception as e:
+        logger.error(
+            "Articles processing failed",
+            extra={
+                'request_id': request.state.request_id,
+                'error': str(e)
+            }
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/ingest-reader")
 async def ingest_reader(request: Request):
     try:
@@ -81,7 +194,7 @@ async def ingest_reader(request: Request):
                 'request_id': request.state.request_id
             }
         )
-        result = await reader_service.process_reader(reader_data)
+        result = await request.app.state.reader_service.process_reader(reader_data)
         logger.info(
             "Reader processed successfully",
             extra={
@@ -119,7 +232,7 @@ async def get_daily_digest(reader_id: str, request: Request):
                 'reader_id': reader_id
             }
         )
-        result = await digest_service.get_daily_digest(reader_id)
+        result = await request.app.state.digest_service.get_daily_digest(reader_id)
         logger.info(
             "Daily digest fetched successfully",
             extra={
@@ -151,25 +264,158 @@ async def get_daily_digest(reader_id: str, request: Request):
         )
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/daily-digests")
+async def get_daily_digests(request: Request):
+    """
+    Get personalized daily digests for a batch of readers.
+
+    Expects a JSON list of reader IDs and returns a list aligned with it, where each
+    item holds either the digest IDs under "result" or a message under "error".
+    """
+    reader_ids = await request.json()
+    if not isinstance(reader_ids, list) or not all(isinstance(reader_id, str) for reader_id in reader_ids):
+        raise HTTPException(status_code=400, detail="Request body must be a list of reader IDs")
+
+    try:
+        logger.info(
+            "Fetching daily digests",
+            extra={
+                'request_id': request.state.request_id,
+                'total': len(reader_ids)
+            }
+        )
+        results = await request.app.state.digest_service.get_daily_digests(reader_ids)
+        logger.info(
+            "Daily digests fetched",
+            extra={
+                'request_id': request.state.request_id,
+                'total': len(results),
+                'failed': sum(1 for item in results if item["error"] is not None)
+            }
+        )
+        return results
+    except Exception as e:
+        logger.error(
+            "Failed to fetch daily digests",
+            extra={
+                'request_id': request.state.request_id,
+                'error': str(e)
+            }
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/batch-digest")
-async def batch_digest(request: Request, background_tasks: BackgroundTasks):
+async def batch_digest(request: Request, background_tasks: BackgroundTasks, mode: str = "full"):
     """
     Endpoint to trigger batch digest processing.
     Returns immediately with a request ID while processing continues in the background.
+
+    Args:
+        mode: "full" reclusters the whole 24-hour window, "incremental" assigns only
+              new articles to the clusters of the previous run
     """
+    if mode not in ("full", "incremental"):
+        raise HTTPException(status_code=400, detail=f"Unknown batch digest mode: {mode}")
+
     request_id = request.state.request_id
     logger.info(
         "Batch digest requested",
         extra={
-            'request_id': request_id
+            'request_id': request_id,
+            'mode': mode
         }
     )
     
     # Schedule the batch processing as a background task
-    background_tasks.add_task(digest_service.process_batch_digest, request_id)
+    if mode == "incremental":
+        background_tasks.add_task(request.app.state.digest_service.process_incremental_digest, request_id)
+    else:
+        background_tasks.add_task(request.app.state.digest_service.process_batch_digest, request_id)
     
     return {
         "message": "Batch Requested",
         "request_id": request_id
     }
 
+@app.get("/api/batch-digest/{version}")
+async def batch_digest_progress(version: int, request: Request):
+    """
+    Get the progress of a batch digest run.
+
+    Returns the run status, the number of pending, done and failed clusters and
+    the digests stored so far for the version.
+    """
+    try:
+        return await request.app.state.digest_service.get_run_progress(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(
+            "Failed to fetch batch digest progress",
+            extra={
+                'request_id': request.state.request_id,
+                'version': version,
+                'error': str(e)
+            }
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/batch-digest/{version}/timings")
+async def batch_digest_timings(version: int, request: Request):
+    """
+    Get the timing report of a batch digest run.
+
+    Returns the duration of each stage, the critical path, cluster totals, the
+    slowest clusters and retry counters of the latest run of the version.
+    """
+    try:
+        return await request.app.state.digest_service.get_timing_report(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(
+            "Failed to fetch batch digest timings",
+            extra={
+                'request_id': request.state.request_id,
+                'version': version,
+                'error': str(e)
+            }
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch-digest/{version}/resume")
+async def resume_batch_digest(version: int, request: Request, background_tasks: BackgroundTasks):
+    """
+    Resume an interrupted batch digest run.
+    Only clusters that are not done are processed again, in the background.
+    Only incomplete or failed runs, or running runs past their lease, can be resumed;
+    other runs get a 409.
+    """
+    request_id = request.state.request_id
+    try:
+        progress = await request.app.state.digest_service.get_run_progress(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # Claimed atomically, so a running run or a concurrent resume is never processed twice
+    if not await request.app.state.digest_service.claim_resume(version):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Digest run {version} is already running or completed; only incomplete or failed runs can be resumed"
+        )
+
+    logger.info(
+        "Batch digest resume requested",
+        extra={
+            'request_id': request_id,
+            'version': version,
+            'status': progress['status']
+        }
+    )
+    background_tasks.add_task(request.app.state.digest_service.resume_batch_digest, version, request_id)
+
+    return {
+        "message": "Resume Requested",
+        "request_id": request_id,
+        "clusters": progress['clusters']
+    }
@@ -1,10 +1,17 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+import asyncio
 import os
 from .fuse_prompt import FusePromptFacade, PromptName
 from ..utils.logger import logger
 from .base_service import BaseService
 
+# Bulk ingestion settings
+ARTICLE_INGESTION_CONCURRENCY = max(1, int(os.getenv("ARTICLE_INGESTION_CONCURRENCY", "8")))
+ARTICLE_EMBEDDING_BATCH_SIZE = max(1, int(os.getenv("ARTICLE_EMBEDDING_BATCH_SIZE", "64")))
+# Largest batch accepted by /api/ingest-articles
+ARTICLE_INGESTION_MAX_BATCH = int(os.getenv("ARTICLE_INGESTION_MAX_BATCH", "500"))
+
 class ArticleIngestionService(BaseService):
     def __init__(self):
         self.fuse_prompt_facade = FusePromptFacade()
@@ -29,16 +36,12 @@ class ArticleIngestionService(BaseService):
         )
         
         # Process with LLM
-        fuseprompt = self.fuse_prompt_facade.get_prompt(PromptName.ARTICLE_INGEST_CHAT)
-        llm = self._get_llm(fuseprompt)
-        instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt, article=article_data)[0]["content"]
-        article_profile = await llm.ainvoke(instructions)
+        article_profile = await self._enrich_article(article_data)
 
         # Process Embeddings
         fuseprompt_embeddings = self.fuse_prompt_facade.get_prompt(PromptName.ARTICLE_EMBEDDINGS)
-        embedder = self._get_embedder(fuseprompt_embeddings)
         embeddings_instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt_embeddings, **article_profile)
-        embeddings = await embedder.aembed_query(embeddings_instructions)
+        embeddings = (await self._embed_documents(fuseprompt_embeddings, [embeddings_instructions]))[0]
 
         logger.info(
             "Article ingestion completed",
@@ -48,4 +51,112 @@ class ArticleIngestionService(BaseService):
         )
 
         article_profile["embeddings"] = embeddings
-        return article_profile 
\ No newline at end of file
+        return article_profile
+
+    async def process_articles(self, articles_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process a batch of articles by:
+        1. Enriching every article with the LLM, at most ARTICLE_INGESTION_CONCURRENCY at a time
+        2. Embedding the enriched profiles with one aembed_documents call per chunk
+
+        Args:
+            articles_data: List of dictionaries containing article information
+
+        Returns:
+            List aligned with the input, where each item is either
+            {"result": <article profile with embeddings>, "error": None} or
+            {"result": None, "error": <error message>}
+        """
+        logger.info(
+            "Starting bulk article ingestion",
+            extra={
+                'total': len(articles_data),
+                'concurrency': ARTICLE_INGESTION_CONCURRENCY
+            }
+        )
+
+        # Process with LLM under a concurrency limit
+        semaphore = asyncio.Semaphore(ARTICLE_INGESTION_CONCURRENCY)
+
+        async def enrich(article_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._enrich_article(article_data)
+
+        profiles = await asyncio.gather(
+            *[enrich(article_data) for article_data in articles_data],
+            return_exceptions=True
+        )
+        results = [
+            # A cancelled item comes back as CancelledError, which is not an Exception
+            {"result": None, "error": str(profile) or type(profile).__name__} if isinstance(profile, BaseException)
+            else {"result": profile, "error": None}
+            for profile in profiles
+        ]
+
+        # Process Embeddings in chunks
+        pending = [i for i, item in enumerate(results) if item["error"] is None]
+        if pending:
+            try:
+                fuseprompt_embeddings = self.fuse_prompt_facade.get_prompt(PromptName.ARTICLE_EMBEDDINGS)
+            except Exception as e:
+                logger.error(
+                    "Bulk article embeddings prompt unavailable",
+                    extra={
+                        'total': len(pending),
+                        'error': str(e)
+                    }
+                )
+                for i in pending:
+                    results[i]["result"], results[i]["error"] = None, str(e)
+                pending = []
+            for start in range(0, len(pending), ARTICLE_EMBEDDING_BATCH_SIZE):
+                chunk = pending[start:start + ARTICLE_EMBEDDING_BATCH_SIZE]
+                await self._embed_chunk(fuseprompt_embeddings, [results[i] for i in chunk])
+
+        failed = sum(1 for item in results if item["error"] is not None)
+        logger.info(
+            "Bulk article ingestion completed",
+            extra={
+                'total': len(results),
+                'failed': failed
+            }
+        )
+        return results
+
+    async def _enrich_article(self, article_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze and enrich a single article with the LLM."""
+        fuseprompt = self.fuse_prompt_facade.get_prompt(PromptName.ARTICLE_INGEST_CHAT)
+        llm = self._get_llm(fuseprompt)
+        instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt, article=article_data)[0]["content"]
+        return await self._invoke_llm(fuseprompt, llm, instructions)
+
+    async def _embed_chunk(self, fuseprompt_embeddings, items: List[Dict[str, Any]]) -> None:
+        """Embed a chunk of enriched profiles in place, marking failures per item."""
+        to_embed = []
+        texts = []
+        for item in items:
+            try:
+                texts.append(self.fuse_prompt_facade.compile_prompt(fuseprompt_embeddings, **item["result"]))
+                to_embed.append(item)
+            except Exception as e:
+                item["result"], item["error"] = None, str(e)
+
+        if not texts:
+            return
+
+        try:
+            embeddings = await self._embed_documents(fuseprompt_embeddings, texts)
+        except Exception as e:
+            logger.error(
+                "Bulk article embeddings failed",
+                extra={
+                    'total': len(texts),
+                    'error': str(e)
+                }
+            )
+            for item in to_embed:
+                item["result"], item["error"] = None, str(e)
+            return
+
+        for item, article_embeddings in zip(to_embed, embeddings):
+            item["result"]["embeddings"] = article_embeddings
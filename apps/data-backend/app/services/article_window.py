@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Metadata kept per article next to its embedding row
+ARTICLE_METADATA_FIELDS = ['_id', 'url', 'title', 'summary', 'image']
+
+class ArticleWindow:
+    """
+    Articles of a digest window, split into a C-contiguous float32 embedding matrix and
+    a metadata DataFrame without embeddings. Row i of both belongs to the same article.
+    """
+
+    def __init__(self, embeddings: np.ndarray, metadata: pd.DataFrame, stats: Optional[Dict[str, Any]] = None):
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.stats = stats or {}
+
+    @property
+    def empty(self) -> bool:
+        return len(self.metadata) == 0
+
+    @property
+    def article_ids(self) -> List[Any]:
+        return self.metadata["_id"].tolist()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Metadata with an embeddings column of row views into the matrix (no copy)."""
+        df = self.metadata.copy()
+        df["embeddings"] = list(self.embeddings)
+        return df
+
+class ArticleWindowBuilder:
+    """
+    Collects streamed article documents into an ArticleWindow.
+
+    Embeddings are written straight into a matrix preallocated for capacity rows, which
+    grows if more documents arrive than expected. Documents missing an embedding or any
+    metadata field are skipped, as the clustering input never contained them.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self.skipped = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._columns: Dict[str, List[Any]] = {field: [] for field in ARTICLE_METADATA_FIELDS}
+        self._rows = 0
+
+    def add(self, document: Dict[str, Any]) -> None:
+        embeddings = document.get("embeddings")
+        if embeddings is None or len(embeddings) == 0 \
+                or any(document.get(field) is None for field in ARTICLE_METADATA_FIELDS):
+            self.skipped += 1
+            return
+
+        if self._matrix is None:
+            self._matrix = np.empty((self.capacity, len(embeddings)), dtype=np.float32)
+        elif self._rows == self._matrix.shape[0]:
+            self._matrix.resize((self._rows * 2, self._matrix.shape[1]), refcheck=False)
+
+        self._matrix[self._rows] = embeddings
+        for field, column in self._columns.items():
+            column.append(document[field])
+        self._rows += 1
+
+    def build(self) -> ArticleWindow:
+        if self._matrix is None:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        else:
+            matrix = self._matrix
+            # Give back unused preallocated rows in place
+            matrix.resize((self._rows, matrix.shape[1]), refcheck=False)
+        self._matrix = None
+        return ArticleWindow(matrix, pd.DataFrame(self._columns, columns=ARTICLE_METADATA_FIELDS))
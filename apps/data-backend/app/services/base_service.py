@@ -1,41 +1,107 @@
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from typing import Any, List
 import os
+import time
+from .client_registry import client_registry
+from .embedding_cache import embedding_cache
 from .fuse_prompt import FusePromptFacade
+from .rate_limiter import LLM_EXPECTED_COMPLETION_TOKENS, embedding_rate_limiter, estimate_tokens, llm_rate_limiter
 from ..utils.logger import logger
+from ..utils.metrics import (
+    EMBEDDING_REQUEST_SECONDS,
+    EMBEDDING_TEXTS,
+    LLM_ERRORS,
+    LLM_REQUEST_SECONDS,
+    observe_token_usage
+)
+from ..utils.tracing import span
 
 class BaseService:
     def __init__(self):
         self.fuse_prompt_facade = FusePromptFacade()
 
     def _get_embedder(self, fuseprompt):
-        """Initialize and return an Azure OpenAI embeddings model."""
-        logger.info(
-            "Initializing Embedder",
-            extra={
-                'model': fuseprompt.config['model']
-            }
-        )
-
-        embedder = AzureOpenAIEmbeddings(
+        """Return the shared Azure OpenAI embeddings model."""
+        return client_registry.get_embedder(
             model='text-embedding-3-large',
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            openai_api_version='2023-05-15',
+            api_version='2023-05-15'
         )
-        return embedder
 
     def _get_llm(self, fuseprompt):
-        """Initialize and return an Azure OpenAI LLM."""
+        """Return the shared Azure OpenAI LLM for the prompt's config."""
+        return client_registry.get_llm(
+            deployment=fuseprompt.config['model'],
+            temperature=fuseprompt.config['temperature'],
+            json_schema=fuseprompt.config.get('json_schema'),
+            api_version=os.getenv("OPENAI_API_VERSION")
+        )
+
+    async def _invoke_llm(self, fuseprompt, llm, instructions) -> Any:
+        """
+        Invoke the LLM through the shared rate limiter, recording latency and token
+        usage under the prompt's name.
+
+        Returns the parsed output for structured output clients, the message otherwise.
+        """
+        prompt = fuseprompt.name
+        started = time.perf_counter()
+        try:
+            with span("llm", prompt=prompt):
+                response = await llm_rate_limiter.run(
+                    lambda: llm.ainvoke(instructions),
+                    estimated_tokens=estimate_tokens(
+                        instructions,
+                        fuseprompt.config.get('max_tokens') or LLM_EXPECTED_COMPLETION_TOKENS
+                    )
+                )
+        except Exception:
+            LLM_ERRORS.labels(prompt).inc()
+            raise
+        finally:
+            LLM_REQUEST_SECONDS.labels(prompt).observe(time.perf_counter() - started)
+
+        if isinstance(response, dict) and 'raw' in response and 'parsed' in response:
+            message, result = response['raw'], response['parsed']
+        else:
+            message, result = response, response
+        if getattr(message, 'usage_metadata', None):
+            observe_token_usage(prompt, message.usage_metadata)
+        if isinstance(response, dict) and response.get('parsing_error') is not None:
+            LLM_ERRORS.labels(prompt).inc()
+            raise response['parsing_error']
+        return result
+
+    async def _embed_documents(self, fuseprompt, texts: List[str]) -> List[List[float]]:
+        """
+        Embed compiled instruction texts, serving repeated texts from the embedding cache.
+
+        Only cache misses reach the embeddings API, in a single aembed_documents call
+        scheduled by the shared embeddings rate limiter.
+        """
+        embedder = self._get_embedder(fuseprompt)
+        keys = [embedding_cache.make_key(embedder.model, embedder.dimensions, text) for text in texts]
+        cached = await embedding_cache.get_many(set(keys))
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            texts_to_embed = list(missing.values())
+            started = time.perf_counter()
+            try:
+                with span("embeddings", prompt=fuseprompt.name, texts=len(texts_to_embed)):
+                    vectors = await embedding_rate_limiter.run(
+                        lambda: embedder.aembed_documents(texts_to_embed),
+                        estimated_tokens=sum(estimate_tokens(text) for text in texts_to_embed)
+                    )
+            finally:
+                EMBEDDING_REQUEST_SECONDS.labels(fuseprompt.name).observe(time.perf_counter() - started)
+            cached.update(await embedding_cache.put_many(dict(zip(missing.keys(), vectors))))
+
+        EMBEDDING_TEXTS.labels(fuseprompt.name, 'cache').inc(len(texts) - len(missing))
+        EMBEDDING_TEXTS.labels(fuseprompt.name, 'api').inc(len(missing))
         logger.info(
-            "Initializing LLM",
+            "Embedded documents",
             extra={
-                'model': fuseprompt.config['model']
+                'total': len(texts),
+                'cache_hits': len(texts) - len(missing)
             }
         )
-        llm = AzureChatOpenAI(
-            azure_deployment=fuseprompt.config['model'],
-            api_version=os.getenv("OPENAI_API_VERSION"),
-            temperature=fuseprompt.config['temperature']
-        )
-        if 'json_schema' in fuseprompt.config:
-            llm = llm.with_structured_output(schema=fuseprompt.config['json_schema'])
-        return llm 
\ No newline at end of file
+        return [cached[key] for key in keys]
@@ -0,0 +1,130 @@
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import httpx
+import json
+import os
+import threading
+from ..utils.logger import logger
+
+# Connection pool settings shared by every LLM and embeddings client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "120"))
+# Retries inside the OpenAI SDK; calls are retried by the rate limiters instead
+LLM_CLIENT_MAX_RETRIES = int(os.getenv("LLM_CLIENT_MAX_RETRIES", "0"))
+
+class ClientRegistry:
+    """
+    Process-wide registry of Azure OpenAI clients.
+
+    Clients are built once per (deployment, temperature, json_schema hash, api version)
+    and share a pair of keep-alive HTTP connection pools.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+
+    def get_llm(self, deployment: str, temperature: float, json_schema: Optional[Dict[str, Any]] = None,
+                api_version: Optional[str] = None) -> Any:
+        """
+        Return a shared chat client, wrapped with structured output when a json_schema is given.
+
+        Structured output clients return {"raw", "parsed", "parsing_error"}; invoke them
+        through BaseService._invoke_llm, which unwraps the parsed result.
+        """
+        key = ('llm', deployment, temperature, self._hash_schema(json_schema), api_version)
+        return self._get_or_create(key, lambda: self._build_llm(deployment, temperature, json_schema, api_version))
+
+    def get_embedder(self, model: str, api_version: str) -> AzureOpenAIEmbeddings:
+        """Return a shared embeddings client."""
+        key = ('embedder', model, api_version)
+        return self._get_or_create(key, lambda: self._build_embedder(model, api_version))
+
+    async def aclose(self) -> None:
+        """Drop every client and close the shared connection pools."""
+        with self._lock:
+            http_client, http_async_client = self._http_client, self._http_async_client
+            self._clients.clear()
+            self._http_client = self._http_async_client = None
+
+        if http_async_client is not None:
+            await http_async_client.aclose()
+        if http_client is not None:
+            http_client.close()
+        logger.info("Closed LLM client pools")
+
+    def _get_or_create(self, key: Tuple, build) -> Any:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                logger.info(
+                    "Creating shared client",
+                    extra={
+                        'client_key': str(key)
+                    }
+                )
+                client = build()
+                self._clients[key] = client
+            return client
+
+    def _build_llm(self, deployment: str, temperature: float, json_schema: Optional[Dict[str, Any]],
+                   api_version: Optional[str]) -> Any:
+        llm = AzureChatOpenAI(
+            azure_deployment=deployment,
+            api_version=api_version,
+            temperature=temperature,
+            max_retries=LLM_CLIENT_MAX_RETRIES,
+            http_client=self._get_http_client(),
+            http_async_client=self._get_http_async_client()
+        )
+        if json_schema is not None:
+            # Keep the raw message next to the parsed output so its token usage can be recorded
+            llm = llm.with_structured_output(schema=json_schema, include_raw=True)
+        return llm
+
+    def _build_embedder(self, model: str, api_version: str) -> AzureOpenAIEmbeddings:
+        return AzureOpenAIEmbeddings(
+            model=model,
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            openai_api_version=api_version,
+            max_retries=LLM_CLIENT_MAX_RETRIES,
+            http_client=self._get_http_client(),
+            http_async_client=self._get_http_async_client()
+        )
+
+    def _get_http_client(self) -> httpx.Client:
+        # Called with self._lock held
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+        return self._http_client
+
+    def _get_http_async_client(self) -> httpx.AsyncClient:
+        # Called with self._lock held
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(limits=self._limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+        return self._http_async_client
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS
+        )
+
+    @staticmethod
+    def _hash_schema(json_schema: Optional[Dict[str, Any]]) -> Optional[str]:
+        if json_schema is None:
+            return None
+        return hashlib.sha256(json.dumps(json_schema, sort_keys=True).encode()).hexdigest()
+
+# Shared by every BaseService in the process
+client_registry = ClientRegistry()
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import glob
+import os
+import joblib
+import numpy as np
+from ..utils.logger import logger
+
+# Where fitted cluster states are persisted, and how many versions are kept
+CLUSTER_STATE_DIR = os.getenv("CLUSTER_STATE_DIR", ".cache/cluster_state")
+CLUSTER_STATE_KEEP = int(os.getenv("CLUSTER_STATE_KEEP", "3"))
+
+class ClusterState:
+    """
+    Fitted clustering of a digest version, used to place new articles incrementally.
+
+    Centroids live in the reduced space produced by the fitted reducer (None when
+    clustering ran on the raw embeddings).
+    """
+
+    def __init__(self,
+                 reducer: Any,
+                 cluster_ids: List[int],
+                 centroids: np.ndarray,
+                 counts: np.ndarray,
+                 members: Dict[int, List[Any]],
+                 assign_threshold: float,
+                 window_end: datetime,
+                 fitted_at: datetime,
+                 version: Optional[int] = None,
+                 assigned_since_fit: int = 0,
+                 unmatched_since_fit: int = 0):
+        self.reducer = reducer
+        self.cluster_ids = cluster_ids
+        self.centroids = centroids
+        self.counts = counts
+        self.members = members
+        self.assign_threshold = assign_threshold
+        self.window_end = window_end
+        self.fitted_at = fitted_at
+        self.version = version
+        self.assigned_since_fit = assigned_since_fit
+        self.unmatched_since_fit = unmatched_since_fit
+
+    @property
+    def drift(self) -> float:
+        """Share of articles placed since the full fit that matched no existing cluster."""
+        if not self.assigned_since_fit:
+            return 0.0
+        return self.unmatched_since_fit / self.assigned_since_fit
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """Project embeddings into the space the centroids live in."""
+        if self.reducer is None:
+            return embeddings
+        return np.ascontiguousarray(self.reducer.transform(embeddings), dtype=np.float32)
+
+class ClusterStateStore:
+    """
+    Persists cluster states on local disk, one joblib file per digest version.
+
+    A state can be written as pending first (e.g. by a clustering worker) and be
+    published once its run completed, or discarded.
+    """
+
+    def __init__(self, directory: str = CLUSTER_STATE_DIR, keep: int = CLUSTER_STATE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, state: ClusterState) -> None:
+        """Persist a state under its version and prune older versions."""
+        self.write(state, self._path(state.version))
+        logger.info(
+            "Cluster state saved",
+            extra={
+                'version': state.version,
+                'total_clusters': len(state.cluster_ids)
+            }
+        )
+        self._prune()
+
+    def pending_path(self, version: int) -> str:
+        """Where the state of a run still in progress is written, see publish."""
+        return self._path(version) + ".pending"
+
+    def publish(self, version: int) -> None:
+        """Make the pending state of version the latest one and prune older versions."""
+        os.replace(self.pending_path(version), self._path(version))
+        logger.info(
+            "Cluster state saved",
+            extra={
+                'version': version
+            }
+        )
+        self._prune()
+
+    def discard(self, version: int) -> None:
+        """Remove the pending state of version, if any."""
+        try:
+            os.remove(self.pending_path(version))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def write(state: ClusterState, path: str) -> None:
+        """Write a state to path atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(state, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def load_latest(self) -> Optional[ClusterState]:
+        """Load the most recent state, or None when nothing was persisted yet."""
+        versions = self._versions()
+        if not versions:
+            return None
+        try:
+            return joblib.load(self._path(versions[-1]))
+        except Exception as e:
+            logger.error(
+                "Failed to load cluster state",
+                extra={
+                    'version': versions[-1],
+                    'error': str(e)
+                }
+            )
+            return None
+
+    def _prune(self) -> None:
+        for stale in self._versions()[:-self.keep]:
+            os.remove(self._path(stale))
+
+    def _path(self, version: int) -> str:
+        return os.path.join(self.directory, f"{version}.joblib")
+
+    def _versions(self) -> List[int]:
+        paths = glob.glob(os.path.join(self.directory, "*.joblib"))
+        return sorted(int(os.path.basename(path).split(".")[0]) for path in paths)
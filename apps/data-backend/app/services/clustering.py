@@ -1,49 +1,75 @@
 import pandas as pd
 import numpy as np
 from sklearn.cluster import HDBSCAN
+from sklearn.metrics import adjusted_rand_score
 from sklearn.neighbors import KNeighborsClassifier
-import umap
+import os
+import time
+from datetime import datetime
+from .cluster_state import ClusterState
+from .reducers import Reducer, get_reducer
 from ..utils.logger import logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+# Clusters smaller than this are dissolved and their members reassigned
+MIN_CLUSTER_ITEMS = 3
+
+# Reducer applied before HDBSCAN, as "name" or "name:dimensions" (see reducers.get_reducer)
+CLUSTERING_REDUCER = os.getenv("CLUSTERING_REDUCER", "umap")
+# Optional reducer spec every run is also clustered with, to record a cluster-agreement score
+CLUSTERING_AGREEMENT_REFERENCE = os.getenv("CLUSTERING_AGREEMENT_REFERENCE", "")
+
+# Incremental assignment: a new article joins the nearest cluster when its distance to the
+# centroid is below CLUSTER_ASSIGN_RADIUS_FACTOR times the 95th percentile member distance
+CLUSTER_ASSIGN_RADIUS_FACTOR = float(os.getenv("CLUSTER_ASSIGN_RADIUS_FACTOR", "1.5"))
 
 class ClusteringService:
     def __init__(self):
-        pass
+        # Timings and settings of the latest fit_clusters run
+        self.last_run: Dict[str, Any] = {}
 
     def _get_np_embeddings(self, df: pd.DataFrame) -> np.ndarray:
-        """Convert embeddings from DataFrame to numpy array."""
-        return df["embeddings"].apply(pd.Series).values
+        """Stack the embeddings column into a single C-contiguous float32 matrix."""
+        return np.ascontiguousarray(np.array(df["embeddings"].tolist(), dtype=np.float32))
 
-    def _fix_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _fix_outliers(self, labels: np.ndarray, embeddings: np.ndarray) -> np.ndarray:
         """
-        Fix outliers in clustering results using KNN.
-        Also handles small clusters (less than 3 items) by marking them as outliers
-        and then re-applying KNN.
+        Reassign outliers and members of small clusters (less than 3 items) in one pass.
+
+        Clusters with at least MIN_CLUSTER_ITEMS members are kept. A single KNN index is
+        fitted on their members and every other point is relabelled with one predict.
+        When no cluster is large enough the existing clusters are kept as they are, and
+        when HDBSCAN found no cluster at all every point is placed in cluster 0.
+
+        Args:
+            labels: Cluster label per row of embeddings, -1 for outliers
+            embeddings: Matrix the labels were computed on
+
+        Returns:
+            Fixed cluster labels
         """
-        def fix_outliers_(df: pd.DataFrame) -> pd.DataFrame:
-            outliers = df[df['cluster'] == -1]
-            if not outliers.empty:
-                knn = KNeighborsClassifier(n_neighbors=3)
-                
-                known_points = df[df['cluster'] != -1]
-                known_points = self._get_np_embeddings(known_points)
-                known_labels = df[df['cluster'] != -1]['cluster']
-                
-                knn.fit(known_points, known_labels)
-                df.loc[df['cluster'] == -1, 'cluster'] = knn.predict(self._get_np_embeddings(outliers))
-            return df
-
-        # Fix initial outliers
-        df = fix_outliers_(df)
-        
-        # Fix small clusters
-        cluster_counts = df['cluster'].value_counts()
-        categories_less_than_3 = cluster_counts[cluster_counts < 3].index.tolist()
-        df["cluster"] = df["cluster"].apply(lambda x: -1 if x in categories_less_than_3 else x)
-        
-        # Fix new outliers from small clusters
-        df = fix_outliers_(df)
-        return df
+        labels = labels.copy()
+        cluster_ids, cluster_counts = np.unique(labels[labels != -1], return_counts=True)
+        if cluster_ids.size == 0:
+            return np.zeros_like(labels)
+
+        kept_ids = cluster_ids[cluster_counts >= MIN_CLUSTER_ITEMS]
+        if kept_ids.size == 0:
+            kept_ids = cluster_ids
+
+        kept = np.isin(labels, kept_ids)
+        reassign = np.flatnonzero(~kept)
+        if reassign.size == 0:
+            return labels
+        if kept_ids.size == 1:
+            labels[reassign] = kept_ids[0]
+            return labels
+
+        known = np.flatnonzero(kept)
+        knn = KNeighborsClassifier(n_neighbors=min(3, known.size))
+        knn.fit(embeddings[known], labels[known])
+        labels[reassign] = knn.predict(embeddings[reassign])
+        return labels
 
     def _dbscan_clusters(self, embeddings: np.ndarray, min_cluster_size: int) -> np.ndarray:
         """Apply HDBSCAN clustering to embeddings."""
@@ -51,12 +77,13 @@ class ClusteringService:
         hdb.fit_predict(embeddings)
         return hdb.labels_
 
-    def get_clusters(self, df: pd.DataFrame, min_cluster_size: int = 2, use_umap: bool = True) -> pd.DataFrame:
+    def get_clusters(self, df: pd.DataFrame, min_cluster_size: int = 2, use_umap: bool = True,
+                     reducer: Optional[str] = None) -> pd.DataFrame:
         """
         Cluster articles based on their embeddings using HDBSCAN algorithm.
         
         The process:
-        1. Optionally reduce dimensionality using UMAP
+        1. Optionally reduce dimensionality (UMAP unless CLUSTERING_REDUCER says otherwise)
         2. Apply HDBSCAN clustering
         3. Fix outliers using KNN
         4. Handle small clusters
@@ -64,44 +91,245 @@ class ClusteringService:
         Args:
             df: DataFrame containing articles with embeddings
             min_cluster_size: Minimum size for a cluster
-            use_umap: Whether to use UMAP dimensionality reduction
+            use_umap: Whether to reduce dimensionality at all
+            reducer: Reducer spec overriding CLUSTERING_REDUCER, e.g. "pca:64"
             
         Returns:
             DataFrame with cluster assignments added as 'cluster' column
         """
+        return self.fit_clusters(df, min_cluster_size, use_umap, reducer)[0]
+
+    def fit_clusters(self, df: pd.DataFrame, min_cluster_size: int = 2, use_umap: bool = True,
+                     reducer: Optional[str] = None) -> Tuple[pd.DataFrame, ClusterState]:
+        """
+        Cluster articles like get_clusters and also return the fitted ClusterState,
+        so that later articles can be assigned incrementally.
+
+        Stage timings, the reducer used and, when CLUSTERING_AGREEMENT_REFERENCE is set,
+        the adjusted Rand index against the reference reducer are kept in self.last_run.
+        The returned state has no version or window yet; the caller sets them.
+        """
+        spec = (reducer or CLUSTERING_REDUCER) if use_umap else "none"
+        df = df.dropna(axis=0).copy()
+
+        # Build the embedding matrix once; every stage works on rows of it
+        labels, state = self.fit_matrix(self.get_embedding_matrix(df), df["_id"].tolist(), min_cluster_size, spec)
+        df["cluster"] = labels
+        return df, state
+
+    def get_embedding_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """Stack the embeddings column of df into a C-contiguous float32 matrix."""
+        return self._get_np_embeddings(df)
+
+    def fit_matrix(self, embeddings: np.ndarray, article_ids: List[Any], min_cluster_size: int = 2,
+                   reducer: Optional[str] = None) -> Tuple[np.ndarray, ClusterState]:
+        """
+        Cluster the rows of an embedding matrix.
+
+        Args:
+            embeddings: float32 matrix with one row per article
+            article_ids: Article ID per row, recorded as cluster members in the state
+            min_cluster_size: Minimum size for a cluster
+            reducer: Reducer spec, defaults to CLUSTERING_REDUCER
+
+        Returns:
+            (labels, state) with one cluster label per row and the fitted ClusterState
+        """
+        spec = reducer or CLUSTERING_REDUCER
         logger.info(
             "Computing clusters",
             extra={
                 'min_cluster_size': min_cluster_size,
-                'use_umap': use_umap,
-                'total_articles': len(df)
+                'reducer': spec,
+                'total_articles': len(article_ids)
             }
         )
 
-        df = df.dropna(axis=0)
-        
-        # Apply UMAP if requested
-        if use_umap:
-            reducer = umap.UMAP(random_state=42)
-            umap_embedding = reducer.fit_transform(self._get_np_embeddings(df))
-            df["embeddings"] = list(umap_embedding)
-
-        # Perform clustering
-        clusters = self._dbscan_clusters(self._get_np_embeddings(df), min_cluster_size)
-        df["cluster"] = clusters
-        
-        # Fix outliers and small clusters
-        df = self._fix_outliers(df)
+        fitted_reducer = get_reducer(spec)
+        reduced, labels, timings = self._run_pipeline(embeddings, fitted_reducer, min_cluster_size)
+
+        self.last_run = {
+            'reducer': fitted_reducer.spec,
+            'total_articles': len(article_ids),
+            'total_clusters': int(np.unique(labels).size),
+            **timings
+        }
+        if CLUSTERING_AGREEMENT_REFERENCE and CLUSTERING_AGREEMENT_REFERENCE != spec:
+            _, reference_labels, _ = self._run_pipeline(
+                embeddings, get_reducer(CLUSTERING_AGREEMENT_REFERENCE), min_cluster_size
+            )
+            self.last_run['agreement_reference'] = CLUSTERING_AGREEMENT_REFERENCE
+            self.last_run['agreement_ari'] = float(adjusted_rand_score(reference_labels, labels))
 
         logger.info(
             "Computed clusters",
+            extra=self.last_run
+        )
+        return labels, self._build_state(fitted_reducer, reduced, labels, article_ids)
+
+    def evaluate_reducers(self, df: pd.DataFrame, specs: List[str], reference: str = "umap",
+                          min_cluster_size: int = 2,
+                          ground_truth: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Cluster the same articles with several reducers and compare them.
+
+        Args:
+            df: DataFrame containing articles with embeddings
+            specs: Reducer specs to evaluate, e.g. ["pca:50", "truncate:256"]
+            reference: Reducer spec whose clustering the others are scored against
+            min_cluster_size: Minimum size for a cluster
+            ground_truth: Optional known label per row of df, e.g. for synthetic corpora
+
+        Returns:
+            One dict per reducer (reference first) with stage timings, cluster count,
+            the adjusted Rand index against the reference clustering and, when
+            ground_truth is given, against the known labels
+        """
+        embeddings = self._get_np_embeddings(df.dropna(axis=0))
+        _, reference_labels, reference_timings = self._run_pipeline(
+            embeddings, get_reducer(reference), min_cluster_size
+        )
+        runs = [(reference, reference_labels, reference_timings)]
+        for spec in specs:
+            _, labels, timings = self._run_pipeline(embeddings, get_reducer(spec), min_cluster_size)
+            runs.append((spec, labels, timings))
+
+        results = []
+        for spec, labels, timings in runs:
+            result = {
+                'reducer': spec,
+                'total_clusters': len(np.unique(labels)),
+                'agreement_ari': float(adjusted_rand_score(reference_labels, labels)),
+                **timings
+            }
+            if ground_truth is not None:
+                result['ground_truth_ari'] = float(adjusted_rand_score(ground_truth, labels))
+            results.append(result)
+        return results
+
+    def _run_pipeline(self, embeddings: np.ndarray, reducer: Reducer,
+                      min_cluster_size: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
+        """Reduce, cluster and fix outliers, timing every stage."""
+        start = time.perf_counter()
+        reduced = np.ascontiguousarray(reducer.fit_transform(embeddings), dtype=np.float32)
+        reduced_at = time.perf_counter()
+        clusters = self._dbscan_clusters(reduced, min_cluster_size)
+        clustered_at = time.perf_counter()
+        labels = self._fix_outliers(clusters, reduced)
+        fixed_at = time.perf_counter()
+        return reduced, labels, {
+            'reduce_seconds': round(reduced_at - start, 3),
+            'hdbscan_seconds': round(clustered_at - reduced_at, 3),
+            'outliers_seconds': round(fixed_at - clustered_at, 3)
+        }
+
+    def assign_clusters(self, state: ClusterState, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Assign new articles to the clusters of a fitted state.
+
+        Articles are projected with the state's reducer and join the nearest centroid
+        when it is within the state's assignment threshold. The rest are grouped into
+        new clusters around the first article that matched nothing. The state's
+        centroids, counts, members and drift counters are updated in place.
+
+        Args:
+            state: Fitted cluster state
+            df: DataFrame containing the new articles with embeddings
+
+        Returns:
+            DataFrame with cluster assignments added as 'cluster' column
+        """
+        df = df.dropna(axis=0).copy()
+        points = state.transform(self._get_np_embeddings(df))
+
+        distances = self._pairwise_distances(points, state.centroids)
+        nearest = distances.argmin(axis=1)
+        matched = distances[np.arange(len(points)), nearest] <= state.assign_threshold
+        labels = np.asarray(state.cluster_ids)[nearest]
+
+        unmatched = np.flatnonzero(~matched)
+        next_id = max(state.cluster_ids, default=-1) + 1
+        new_centroids: List[np.ndarray] = []
+        for i in unmatched:
+            if new_centroids:
+                new_distances = np.linalg.norm(np.asarray(new_centroids) - points[i], axis=1)
+                if new_distances.min() <= state.assign_threshold:
+                    labels[i] = next_id + int(new_distances.argmin())
+                    continue
+            labels[i] = next_id + len(new_centroids)
+            new_centroids.append(points[i])
+
+        self._update_state(state, points, labels, df["_id"].tolist())
+        state.assigned_since_fit += len(points)
+        state.unmatched_since_fit += len(unmatched)
+        df["cluster"] = labels
+
+        logger.info(
+            "Assigned articles to existing clusters",
             extra={
-                'total_clusters': df["cluster"].nunique(),
-                'total_articles': len(df)
+                'total_articles': len(df),
+                'matched': int(matched.sum()),
+                'new_clusters': len(new_centroids),
+                'drift': state.drift
             }
         )
         return df
 
+    def _build_state(self, reducer: Reducer, embeddings: np.ndarray, labels: np.ndarray,
+                     article_ids: List[Any]) -> ClusterState:
+        """Compute centroids, members and the assignment threshold of a fitted clustering."""
+        cluster_ids = np.unique(labels)
+        centroids = np.stack([embeddings[labels == c].mean(axis=0) for c in cluster_ids]).astype(np.float32)
+        counts = np.array([(labels == c).sum() for c in cluster_ids])
+        own_distances = np.linalg.norm(embeddings - centroids[np.searchsorted(cluster_ids, labels)], axis=1)
+        members: Dict[int, List[Any]] = {int(c): [] for c in cluster_ids}
+        for article_id, label in zip(article_ids, labels):
+            members[int(label)].append(article_id)
+
+        return ClusterState(
+            reducer=reducer,
+            cluster_ids=[int(c) for c in cluster_ids],
+            centroids=centroids,
+            counts=counts,
+            members=members,
+            assign_threshold=float(np.percentile(own_distances, 95)) * CLUSTER_ASSIGN_RADIUS_FACTOR,
+            window_end=datetime.utcnow(),
+            fitted_at=datetime.utcnow()
+        )
+
+    def _update_state(self, state: ClusterState, points: np.ndarray, labels: np.ndarray,
+                      article_ids: List[Any]) -> None:
+        """Fold newly assigned points into the state's running centroids."""
+        index = {cluster_id: i for i, cluster_id in enumerate(state.cluster_ids)}
+        centroids, counts = list(state.centroids), list(state.counts)
+        for label in np.unique(labels):
+            label = int(label)
+            rows = labels == label
+            if label not in index:
+                index[label] = len(centroids)
+                state.cluster_ids.append(label)
+                state.members[label] = []
+                centroids.append(np.zeros(points.shape[1], dtype=np.float32))
+                counts.append(0)
+            i = index[label]
+            total = counts[i] + rows.sum()
+            centroids[i] = (centroids[i] * counts[i] + points[rows].sum(axis=0)) / total
+            counts[i] = total
+        state.centroids = np.asarray(centroids, dtype=np.float32)
+        state.counts = np.asarray(counts)
+        for article_id, label in zip(article_ids, labels):
+            state.members[int(label)].append(article_id)
+
+    @staticmethod
+    def _pairwise_distances(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Euclidean distances between every point and every centroid."""
+        squared = (
+            (points ** 2).sum(axis=1)[:, None]
+            - 2 * points @ centroids.T
+            + (centroids ** 2).sum(axis=1)[None, :]
+        )
+        return np.sqrt(np.maximum(squared, 0))
+
     def print_clusters(self, df: pd.DataFrame) -> None:
         """Print cluster contents for debugging/logging purposes."""
         for c in df["cluster"].unique():
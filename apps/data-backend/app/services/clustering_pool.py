@@ -0,0 +1,211 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import multiprocessing
+import os
+import pickle
+import signal
+import numpy as np
+import pandas as pd
+from .cluster_state import ClusterState, ClusterStateStore
+from .clustering import ClusteringService
+from ..utils.logger import logger
+from ..utils.metrics import CLUSTERING_STAGES, observe_clustering
+from ..utils.tracing import annotate, record_stages, traced
+
+# Worker processes for clustering; 0 runs clustering in a thread of the serving process
+CLUSTERING_POOL_SIZE = int(os.getenv("CLUSTERING_POOL_SIZE", "1"))
+CLUSTERING_TIMEOUT_SECONDS = float(os.getenv("CLUSTERING_TIMEOUT_SECONDS", "1800"))
+
+def _init_worker() -> None:
+    """Restore default SIGTERM handling, which the Coralogix handler overrides on import."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def _fit_and_store(service: ClusteringService, embeddings: np.ndarray, article_ids: List[Any],
+                   min_cluster_size: int, reducer: Optional[str], state_path: Optional[str],
+                   state_attributes: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, Optional[ClusterState]]:
+    """Fit, then write the state to state_path (if given) instead of returning it."""
+    labels, state = service.fit_matrix(embeddings, article_ids, min_cluster_size, reducer)
+    if state_path is None:
+        return labels, state
+    for name, value in (state_attributes or {}).items():
+        setattr(state, name, value)
+    ClusterStateStore.write(state, state_path)
+    return labels, None
+
+def _fit_in_worker(shm_name: str, shape: Tuple[int, int], article_ids: List[Any],
+                   min_cluster_size: int, reducer: Optional[str], state_path: Optional[str],
+                   state_attributes: Optional[Dict[str, Any]]) -> bytes:
+    """Cluster an embedding matrix held in shared memory, inside a pool worker."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        embeddings = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        service = ClusteringService()
+        labels, state = _fit_and_store(
+            service, embeddings, article_ids, min_cluster_size, reducer, state_path, state_attributes
+        )
+        # Pickle here, so nothing references the shared buffer (e.g. a fitted reducer) once it is closed
+        payload = pickle.dumps((labels, state, service.last_run), protocol=pickle.HIGHEST_PROTOCOL)
+        del embeddings, labels, state, service
+        return payload
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # A failed fit can leave views alive in the traceback; the mapping goes with the worker
+            pass
+
+class ClusteringPool:
+    """
+    Runs ClusteringService.fit_matrix in a dedicated process pool.
+
+    The embedding matrix is handed to workers through shared memory instead of being
+    pickled, and each run is bounded by a timeout. A timed out or cancelled run
+    terminates the pool, which is recreated on the next run. Fitted states hold the
+    reducer, which for UMAP keeps its whole training matrix, so callers that only
+    persist the state have the worker write it to disk instead of sending it back.
+    """
+
+    def __init__(self, size: int = CLUSTERING_POOL_SIZE, timeout_seconds: float = CLUSTERING_TIMEOUT_SECONDS):
+        self.size = size
+        self.timeout_seconds = timeout_seconds
+        self.last_run: Dict[str, Any] = {}
+        self._pool = None
+        self._pending: Set[asyncio.Future] = set()
+
+    async def fit_clusters(self, df: pd.DataFrame, min_cluster_size: int = 2,
+                           reducer: Optional[str] = None) -> Tuple[pd.DataFrame, ClusterState]:
+        """
+        Cluster articles like ClusteringService.fit_clusters, off the event loop.
+
+        Raises:
+            TimeoutError: If clustering exceeds the pool's timeout
+        """
+        service = ClusteringService()
+        df = df.dropna(axis=0).copy()
+        labels, state = await self.fit_matrix(
+            service.get_embedding_matrix(df), df["_id"].tolist(), min_cluster_size, reducer
+        )
+        df["cluster"] = labels
+        return df, state
+
+    @traced("clustering")
+    async def fit_matrix(self, embeddings: np.ndarray, article_ids: List[Any], min_cluster_size: int = 2,
+                         reducer: Optional[str] = None, state_path: Optional[str] = None,
+                         state_attributes: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Optional[ClusterState]]:
+        """
+        Cluster the rows of a float32 embedding matrix, see ClusteringService.fit_matrix.
+
+        With state_path, the fitted state is written there (see ClusterStateStore.write)
+        with state_attributes set on it, and None is returned in its place.
+        """
+        if self.size == 0:
+            service = ClusteringService()
+            labels, state = await asyncio.to_thread(
+                _fit_and_store, service, embeddings, article_ids, min_cluster_size, reducer,
+                state_path, state_attributes
+            )
+            self._record_run(service.last_run)
+            return labels, state
+
+        shm = SharedMemory(create=True, size=max(embeddings.nbytes, 1))
+        try:
+            shared = np.ndarray(embeddings.shape, dtype=np.float32, buffer=shm.buf)
+            shared[:] = embeddings
+            del shared
+            payload = await self._submit(
+                _fit_in_worker,
+                (shm.name, embeddings.shape, article_ids, min_cluster_size, reducer, state_path, state_attributes)
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+        labels, state, last_run = pickle.loads(payload)
+        self._record_run(last_run)
+        return labels, state
+
+    def _record_run(self, last_run: Dict[str, Any]) -> None:
+        """Keep the stats of a finished run and report its stage timings to metrics and the trace."""
+        self.last_run = last_run
+        observe_clustering(last_run)
+        # Stages ran in the worker, so they are added to the trace once the run returns
+        record_stages({
+            stage: last_run[key]
+            for key, stage in CLUSTERING_STAGES.items()
+            if last_run.get(key) is not None
+        })
+        annotate(
+            reducer=last_run.get('reducer'),
+            total_articles=last_run.get('total_articles'),
+            total_clusters=last_run.get('total_clusters')
+        )
+
+    async def cancel(self) -> None:
+        """Stop every running clustering job, waiting for the workers off the event loop."""
+        pool = self._detach_pool()
+        if pool is not None:
+            await asyncio.to_thread(self._terminate, pool)
+
+    def close(self) -> None:
+        """Shut the pool down at exit, stopping any running job."""
+        pool = self._detach_pool()
+        if pool is not None:
+            self._terminate(pool)
+
+    def _detach_pool(self):
+        """Fail pending runs and hand the pool over for termination; the next run starts a new one."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return None
+        logger.info(
+            "Terminating clustering pool",
+            extra={
+                'pending': len(self._pending)
+            }
+        )
+        for future in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Clustering pool was terminated"))
+        self._pending.clear()
+        return pool
+
+    @staticmethod
+    def _terminate(pool) -> None:
+        pool.terminate()
+        pool.join()
+
+    async def _submit(self, func, args: Tuple) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.add(future)
+
+        def resolve(result):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+        def reject(error):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(error))
+
+        self._get_pool().apply_async(func, args, callback=resolve, error_callback=reject)
+        try:
+            return await asyncio.wait_for(future, self.timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Clustering timed out",
+                extra={
+                    'timeout_seconds': self.timeout_seconds
+                }
+            )
+            await self.cancel()
+            raise TimeoutError(f"Clustering exceeded {self.timeout_seconds} seconds")
+        except asyncio.CancelledError:
+            await self.cancel()
+            raise
+        finally:
+            self._pending.discard(future)
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Spawned workers do not inherit the event loop, Mongo clients or HTTP pools
+            self._pool = multiprocessing.get_context("spawn").Pool(processes=self.size, initializer=_init_worker)
+        return self._pool
@@ -1,14 +1,97 @@
+from __future__ import annotations
 from time import timezone
-from typing import Dict, Any, List, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+from collections import Counter
+import numpy as np
 from datetime import datetime, timedelta
 import asyncio
+import hashlib
+import os
 import time
 from .base_service import BaseService
-from .clustering import ClusteringService
+from .digest_index import DigestIndex
+from .digest_writer import DigestWriteBuffer
 from .mongodb import MongoDBService
 from .fuse_prompt import PromptName
+from .rate_limiter import LLM_MAX_CONCURRENCY, embedding_rate_limiter, llm_rate_limiter
 from ..utils.logger import logger
+from ..utils.metrics import (
+    BATCH_RUNS_IN_PROGRESS,
+    CLUSTER_JOBS_IN_PROGRESS,
+    CLUSTERING_STAGE_SECONDS,
+    track_in_progress
+)
+from ..utils.tracing import Trace, annotate, span, start_trace, traced
+
+if TYPE_CHECKING:
+    # pandas, scikit-learn and UMAP are imported on first batch use, see DigestService
+    import pandas as pd
+    from .article_window import ArticleWindow
+    from .clustering import ClusteringService
+    from .clustering_pool import ClusteringPool
+    from .cluster_state import ClusterState, ClusterStateStore
+
+# Maximum number of digest sections embedded in a single request
+DIGEST_EMBEDDING_BATCH_SIZE = int(os.getenv("DIGEST_EMBEDDING_BATCH_SIZE", "64"))
+
+# Incremental digests fall back to a full recluster when the share of new articles that
+# matched no existing cluster exceeds CLUSTER_DRIFT_THRESHOLD, or the fitted state is too old
+CLUSTER_DRIFT_THRESHOLD = float(os.getenv("CLUSTER_DRIFT_THRESHOLD", "0.3"))
+CLUSTER_STATE_MAX_AGE_HOURS = float(os.getenv("CLUSTER_STATE_MAX_AGE_HOURS", "24"))
+
+# Documents fetched per cursor round trip when streaming the article window
+ARTICLE_STREAM_BATCH_SIZE = int(os.getenv("ARTICLE_STREAM_BATCH_SIZE", "1000"))
+
+# Daily digest retrieval: "atlas" ($vectorSearch) or "local" (in-process DigestIndex)
+DIGEST_RETRIEVAL_BACKEND = os.getenv("DIGEST_RETRIEVAL_BACKEND", "atlas")
+DIGEST_RETRIEVAL_LIMIT = int(os.getenv("DIGEST_RETRIEVAL_LIMIT", "100"))
+
+# Cluster jobs running at once, and how long one may take once started
+CLUSTER_JOB_CONCURRENCY = int(os.getenv("CLUSTER_JOB_CONCURRENCY", str(LLM_MAX_CONCURRENCY)))
+CLUSTER_JOB_TIMEOUT_SECONDS = float(os.getenv("CLUSTER_JOB_TIMEOUT_SECONDS", "300"))
+
+# Full runs copy the digests of clusters whose members match a cluster of the previous
+# run instead of regenerating them; 1.0 reuses exact matches only
+DIGEST_REUSE_ENABLED = os.getenv("DIGEST_REUSE_ENABLED", "true").lower() == "true"
+DIGEST_REUSE_JACCARD_THRESHOLD = float(os.getenv("DIGEST_REUSE_JACCARD_THRESHOLD", "1.0"))
+
+# Runs that may be resumed; a running run is still being processed by its own task,
+# unless its manifest was not updated for RUN_LEASE_SECONDS and its process has died
+RESUMABLE_RUN_STATUSES = ["incomplete", "failed"]
+RUN_LEASE_SECONDS = float(os.getenv("RUN_LEASE_SECONDS", "3600"))
+
+# Rank every reader against each published version and store the results in reader_digests
+MATERIALIZE_READER_DIGESTS = os.getenv("MATERIALIZE_READER_DIGESTS", "true").lower() == "true"
+READER_DIGESTS_CHUNK_SIZE = int(os.getenv("READER_DIGESTS_CHUNK_SIZE", "1000"))
+
+ARTICLE_PROJECTION = {
+    '_id': 1, 
+    'url': 1, 
+    'title': '$enrichment.title', 
+    'summary': '$enrichment.summary', 
+    'embeddings': 1, 
+    'image': 1
+}
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak resident set size of this process (VmHWM), where Linux allows it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process since the last reset, where /proc is available."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
 
 class DigestEntity:
     def __init__(self, 
@@ -57,17 +140,67 @@ class DigestEntity:
 class DigestService(BaseService):
     def __init__(self):
         super().__init__()
-        self.clustering_service = ClusteringService()
         self.mongodb = MongoDBService()
+        self.digest_index = DigestIndex(self.mongodb)
+        # Built on first batch use, so workers that only serve ingestion and retrieval
+        # never import the clustering stack
+        self._clustering_service: Optional[ClusteringService] = None
+        self._clustering_pool: Optional[ClusteringPool] = None
+        self._cluster_state_store: Optional[ClusterStateStore] = None
+
+    @property
+    def clustering_service(self) -> ClusteringService:
+        if self._clustering_service is None:
+            from .clustering import ClusteringService
+            self._clustering_service = ClusteringService()
+        return self._clustering_service
+
+    @property
+    def clustering_pool(self) -> ClusteringPool:
+        if self._clustering_pool is None:
+            from .clustering_pool import ClusteringPool
+            self._clustering_pool = ClusteringPool()
+        return self._clustering_pool
+
+    @property
+    def cluster_state_store(self) -> ClusterStateStore:
+        if self._cluster_state_store is None:
+            from .cluster_state import ClusterStateStore
+            self._cluster_state_store = ClusterStateStore()
+        return self._cluster_state_store
+
+    def close(self) -> None:
+        """Shut the clustering pool down, if a batch run started it."""
+        if self._clustering_pool is not None:
+            self._clustering_pool.close()
 
     def _get_current_version(self) -> int:
         """Get current version as milliseconds since epoch."""
         return int(time.time() * 1000)
 
-    async def get_latest_articles(self, version: int) -> pd.DataFrame:
-        """Retrieve articles from the last 24 hours."""
-        utcnow = datetime.utcnow()
-        last_24_hours = utcnow - timedelta(hours=24)
+    @traced("get_latest_articles")
+    async def get_latest_articles(self, version: int, start: Optional[datetime] = None,
+                                  end: Optional[datetime] = None) -> pd.DataFrame:
+        """Retrieve articles created between start and end, by default the last 24 hours."""
+        window = await self.get_article_window(version, start, end)
+        articles_df = window.to_frame()
+        articles_df["version"] = version
+        return articles_df
+
+    @traced("get_article_window")
+    async def get_article_window(self, version: int, start: Optional[datetime] = None,
+                                 end: Optional[datetime] = None,
+                                 batch_size: int = ARTICLE_STREAM_BATCH_SIZE) -> ArticleWindow:
+        """
+        Stream the articles created between start and end, by default the last 24 hours,
+        into an ArticleWindow.
+
+        The cursor is read batch_size documents at a time and every embedding is copied
+        into a matrix preallocated from the matching article count, so the full result
+        set is never held as documents or as a DataFrame of lists.
+        """
+        utcnow = end or datetime.utcnow()
+        last_24_hours = start or utcnow - timedelta(hours=24)
         logger.info(
             "Retrieving last 24 hours articles",
             extra={
@@ -76,41 +209,53 @@ class DigestService(BaseService):
                 'version': version
             }
         )
-        
+
+        query = {
+            "createdAt": {
+                "$gte": last_24_hours,
+                "$lte": utcnow
+            }
+        }
         pipeline = [
             {
-                '$match': {
-                    "createdAt": {
-                        "$gte": last_24_hours,
-                        "$lte": utcnow
-                    }
-                }
+                '$match': query
             },
             {
-                '$project': {
-                    '_id': 1, 
-                    'url': 1, 
-                    'title': '$enrichment.title', 
-                    'summary': '$enrichment.summary', 
-                    'embeddings': 1, 
-                    'image': 1
-                }
+                '$project': ARTICLE_PROJECTION
             }
         ]
-        
-        articles = await self.mongodb.aggregate_articles(pipeline)
-        articles_df = pd.DataFrame(articles)
-        articles_df["version"] = version
-        
+
+        from .article_window import ArticleWindowBuilder
+
+        started = time.perf_counter()
+        peak_reset = _reset_peak_rss()
+        builder = ArticleWindowBuilder(await self.mongodb.count_articles(query))
+        async for article in self.mongodb.stream_articles(pipeline, batch_size):
+            builder.add(article)
+        window = builder.build()
+        peak_rss = _peak_rss_bytes() if peak_reset else None
+
+        window.stats = {
+            'total': len(window.metadata),
+            'skipped': builder.skipped,
+            'batch_size': batch_size,
+            'seconds': round(time.perf_counter() - started, 3),
+            'matrix_mb': round(window.embeddings.nbytes / 2**20, 1),
+            'metadata_mb': round(float(window.metadata.memory_usage(deep=True).sum()) / 2**20, 1),
+            # Whole-process peak during the build, so concurrent requests are included;
+            # without the reset it would be the peak since startup, hence None then
+            'peak_rss_mb': round(peak_rss / 2**20, 1) if peak_rss is not None else None
+        }
         logger.info(
             "Retrieved articles",
             extra={
-                'total': articles_df.shape[0],
+                **window.stats,
                 'version': version
             }
         )
-        return articles_df
+        return window
 
+    @traced("get_cluster_digest")
     async def get_cluster_digest(self, df_cluster: pd.DataFrame) -> List[Dict[str, Any]]:
         """
         Create a digest for a cluster of articles using LLM and embeddings.
@@ -144,11 +289,10 @@ class DigestService(BaseService):
                 fuseprompt, 
                 cluster_articles=cluster_articles_info
             )
-            daily_digest = await llm.ainvoke(instructions)
+            daily_digest = await self._invoke_llm(fuseprompt, llm, instructions)
             
-            # Generate embeddings for each digest section
-            embeddings_tasks = [self._get_digest_embeddings(dd) for dd in daily_digest['sections']]
-            daily_digest_w_emb = await asyncio.gather(*embeddings_tasks)
+            # Generate embeddings for all digest sections in batched calls
+            daily_digest_w_emb = await self._get_digest_embeddings(daily_digest['sections'])
             
             # Add cluster metadata and filter out failed embeddings
             daily_digests = []
@@ -180,57 +324,87 @@ class DigestService(BaseService):
         )
         return daily_digests
 
-    async def _get_digest_embeddings(self, digest: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate embeddings for a digest section."""
-        try:
-            logger.info(
-                f"Creating digest embeddings",
-                extra={
-                    'title': digest["title"]
-                }
-            )
-            
-            fuseprompt_embeddings = self.fuse_prompt_facade.get_prompt(PromptName.DIGEST_EMBEDDINGS)
-            embedder = self._get_embedder(fuseprompt_embeddings)
-            embeddings_instructions = self.fuse_prompt_facade.compile_prompt(
-                fuseprompt_embeddings, 
-                **digest
-            )
-            digest_embeddings = await embedder.aembed_query(embeddings_instructions)
-            digest["embeddings"] = digest_embeddings
-            
-            logger.info(
-                "Created digest embeddings",
-                extra={
-                    'title': digest["title"]
-                }
-            )
-            return digest
-            
-        except Exception as e:
-            logger.error(
-                f"Digest embeddings failed",
-                extra={
-                    'title': digest["title"],
-                    'error': str(e)
-                }
-            )
-            return None
+    async def _get_digest_embeddings(self, digests: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Generate embeddings for the sections of a cluster digest.
+
+        The embeddings prompt is fetched once and sections are embedded in batches of
+        DIGEST_EMBEDDING_BATCH_SIZE. Failures are tracked per section: a section whose
+        instructions fail to compile, or whose batch fails, is returned as None.
+        """
+        logger.info(
+            "Creating digest embeddings",
+            extra={
+                'total': len(digests)
+            }
+        )
+
+        fuseprompt_embeddings = self.fuse_prompt_facade.get_prompt(PromptName.DIGEST_EMBEDDINGS)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(digests)
+        pending = []
+        for i, digest in enumerate(digests):
+            try:
+                instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt_embeddings, **digest)
+                pending.append((i, instructions))
+            except Exception as e:
+                self._log_digest_embeddings_error(digest, e)
+
+        for start in range(0, len(pending), DIGEST_EMBEDDING_BATCH_SIZE):
+            chunk = pending[start:start + DIGEST_EMBEDDING_BATCH_SIZE]
+            try:
+                embeddings = await self._embed_documents(
+                    fuseprompt_embeddings,
+                    [instructions for _, instructions in chunk]
+                )
+            except Exception as e:
+                for i, _ in chunk:
+                    self._log_digest_embeddings_error(digests[i], e)
+                continue
+
+            for (i, _), digest_embeddings in zip(chunk, embeddings):
+                digests[i]["embeddings"] = digest_embeddings
+                results[i] = digests[i]
 
-    async def process_cluster_job(self, cluster_df: pd.DataFrame, request_id: str) -> None:
+        logger.info(
+            "Created digest embeddings",
+            extra={
+                'total': len(digests),
+                'failed': sum(1 for result in results if result is None)
+            }
+        )
+        return results
+
+    def _log_digest_embeddings_error(self, digest: Dict[str, Any], error: Exception) -> None:
+        logger.error(
+            "Digest embeddings failed",
+            extra={
+                'title': digest.get("title"),
+                'error': str(error)
+            }
+        )
+
+    @traced("process_cluster_job")
+    async def process_cluster_job(self, cluster_df: pd.DataFrame, request_id: str,
+                                  digest_writer: Optional[DigestWriteBuffer] = None) -> bool:
         """
         Process a single cluster job:
         1. Generate digest for the cluster
         2. Convert results to DigestEntity
-        3. Store in database
+        3. Store in database, through digest_writer when given or with one
+           insert_digests call otherwise
         
         Args:
             cluster_df: DataFrame containing articles from one cluster
             request_id: Request ID for logging correlation
+            digest_writer: Write buffer shared by the cluster jobs of a batch
+
+        Returns:
+            bool: Whether digests were generated for the cluster
         """
         try:
             cluster_id = cluster_df["cluster"].iloc[0]
             version = int(cluster_df["version"].iloc[0])  # Ensure version is int
+            annotate(cluster=str(cluster_id), articles=len(cluster_df))
             
             logger.info(
                 "Processing cluster job",
@@ -244,6 +418,7 @@ class DigestService(BaseService):
             
             digests = await self.get_cluster_digest(cluster_df)
             if digests:
+                documents = []
                 for digest in digests:
                     # Convert the digest to our entity format
                     digest_entity = DigestEntity(
@@ -260,10 +435,14 @@ class DigestService(BaseService):
                         cluster=str(cluster_id),
                         version=version  # Use the int version
                     )
-                    
-                    # Store in database
-                    await self.mongodb.insert_digest(digest_entity.to_dict())
-                
+                    documents.append(digest_entity.to_dict())
+
+                # Store in database
+                if digest_writer is not None:
+                    await digest_writer.add(documents)
+                else:
+                    await self.mongodb.insert_digests(documents)
+
                 logger.info(
                     "Completed cluster job",
                     extra={
@@ -273,6 +452,19 @@ class DigestService(BaseService):
                         "digests_created": len(digests)
                     }
                 )
+                annotate(succeeded=True, digests=len(digests))
+                return True
+
+            logger.error(
+                "Cluster job produced no digests",
+                extra={
+                    "request_id": request_id,
+                    "cluster": cluster_id,
+                    "version": version
+                }
+            )
+            annotate(succeeded=False)
+            return False
         except Exception as e:
             logger.error(
                 "Cluster job failed",
@@ -283,7 +475,10 @@ class DigestService(BaseService):
                     "error": str(e)
                 }
             )
+            annotate(succeeded=False)
+            return False
 
+    @track_in_progress(BATCH_RUNS_IN_PROGRESS.labels("full"))
     async def process_batch_digest(self, request_id: str) -> None:
         """
         Process the batch digest job:
@@ -295,6 +490,7 @@ class DigestService(BaseService):
             request_id: Request ID for logging correlation
         """
         version = self._get_current_version()
+        window_end = datetime.utcnow()
         logger.info(
             "Starting batch digest",
             extra={
@@ -303,10 +499,11 @@ class DigestService(BaseService):
             }
         )
 
+        trace = start_trace("batch_digest", mode="full", version=version)
         try:
             # Get latest articles
-            articles_df = await self.get_latest_articles(version)
-            if articles_df.empty:
+            window = await self.get_article_window(version, end=window_end)
+            if window.empty:
                 logger.info(
                     "No articles found for processing",
                     extra={
@@ -316,49 +513,724 @@ class DigestService(BaseService):
                 )
                 return
 
-            # Cluster articles
-            clusters_df = self.clustering_service.get_clusters(articles_df)
+            # Cluster articles in the clustering process pool, off the event loop; the worker
+            # writes the fitted state to disk, so only the labels come back
+            labels, _ = await self.clustering_pool.fit_matrix(
+                window.embeddings, window.article_ids,
+                state_path=self.cluster_state_store.pending_path(version),
+                state_attributes={'version': version, 'window_end': window_end}
+            )
+            clusters_df = window.metadata.assign(cluster=labels, version=version)
             unique_clusters = clusters_df["cluster"].unique()
+            # Cluster jobs only need the metadata; release the embedding matrix
+            del window
+
+            # Checkpoint the cluster membership so the run can be resumed
+            manifest = self._cluster_manifest(clusters_df)
+            reuse_version, reused = await self._find_reusable_clusters(manifest, version)
+            for cluster, previous_cluster in reused.items():
+                manifest[cluster]['reusedFrom'] = {'version': reuse_version, 'cluster': previous_cluster}
+            await self.mongodb.create_digest_run(version, request_id, manifest)
+
+            if reused:
+                await self._copy_reused_digests(reuse_version, version, reused, request_id)
+            remaining_clusters = [cluster for cluster in unique_clusters if str(cluster) not in reused]
+            completed = await self._run_cluster_jobs(clusters_df, remaining_clusters, request_id, version)
+            status = "completed" if completed else "incomplete"
+            await self.mongodb.set_digest_run_status(version, status)
+
+            # Keep the fitted clustering so later runs can assign new articles incrementally,
+            # unless failed clusters would be missing from the digests they copy
+            if completed:
+                await asyncio.to_thread(self.cluster_state_store.publish, version)
+            else:
+                await asyncio.to_thread(self.cluster_state_store.discard, version)
+            # Only completed versions are served, see MongoDBService.get_latest_digest_version
+            if completed:
+                await self._publish_version(version)
+            await self._save_timing_report(trace, version, request_id, status)
             
             logger.info(
-                "Launching cluster jobs",
+                "Completed batch digest processing",
                 extra={
                     "request_id": request_id,
                     "version": version,
-                    "total_clusters": len(unique_clusters)
+                    "total_clusters_processed": len(unique_clusters)
+                }
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            # A cancelled task, e.g. on shutdown, must not leave the run running
+            logger.error(
+                "Batch digest processing failed",
+                extra={
+                    "request_id": request_id,
+                    "version": version,
+                    "error": str(e)
+                }
+            )
+            await self._fail_digest_run(version)
+            if self._cluster_state_store is not None:
+                await asyncio.to_thread(self._cluster_state_store.discard, version)
+            await self._save_timing_report(trace, version, request_id, "failed")
+            raise
+        finally:
+            trace.close()
+
+    @track_in_progress(BATCH_RUNS_IN_PROGRESS.labels("incremental"))
+    async def process_incremental_digest(self, request_id: str) -> None:
+        """
+        Process an incremental batch digest job:
+        1. Load the cluster state persisted by the last run
+        2. Retrieve only the articles created since that run
+        3. Assign them to the nearest existing cluster, or to new clusters
+        4. Regenerate digests for the clusters that changed and copy the others
+           into the new version
+
+        Falls back to a full process_batch_digest when no state exists, the state is
+        older than CLUSTER_STATE_MAX_AGE_HOURS or drift exceeds CLUSTER_DRIFT_THRESHOLD.
+
+        Args:
+            request_id: Request ID for logging correlation
+        """
+        # The store reads and writes joblib files, so keep it off the event loop
+        state = await asyncio.to_thread(self.cluster_state_store.load_latest)
+        if self._needs_full_recluster(state):
+            logger.warning(
+                "Incremental digest falling back to full recluster",
+                extra={
+                    "request_id": request_id,
+                    "has_state": state is not None
                 }
             )
+            await self.process_batch_digest(request_id)
+            return
+
+        version = self._get_current_version()
+        window_end = datetime.utcnow()
+        logger.info(
+            "Starting incremental digest",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "base_version": state.version
+            }
+        )
+
+        trace = start_trace("batch_digest", mode="incremental", version=version, base_version=state.version)
+        try:
+            new_articles_df = await self.get_latest_articles(version, start=state.window_end, end=window_end)
+            if new_articles_df.empty:
+                logger.info(
+                    "No new articles for incremental digest",
+                    extra={
+                        "request_id": request_id,
+                        "base_version": state.version
+                    }
+                )
+                return
 
-            # Create tasks for each cluster
-            tasks = []
-            for cluster in unique_clusters:
-                cluster_df = clusters_df[clusters_df["cluster"] == cluster]
-                task = asyncio.create_task(
-                    self.process_cluster_job(cluster_df, request_id)
+            with CLUSTERING_STAGE_SECONDS.labels("assign").time(), span("assign_clusters"):
+                assigned_df = await asyncio.to_thread(self.clustering_service.assign_clusters, state, new_articles_df)
+            if state.drift > CLUSTER_DRIFT_THRESHOLD:
+                logger.info(
+                    "Cluster drift above threshold, running full recluster",
+                    extra={
+                        "request_id": request_id,
+                        "drift": state.drift
+                    }
                 )
-                tasks.append(task)
+                await self.process_batch_digest(request_id)
+                return
+
+            # Regenerate changed clusters from their members still in the window, copy the rest
+            changed_clusters = [int(c) for c in assigned_df["cluster"].unique()]
+            unchanged_clusters = [str(c) for c in state.cluster_ids if c not in changed_clusters]
+            clusters_df = await self._load_cluster_articles(
+                {cluster: state.members[cluster] for cluster in changed_clusters}, version,
+                since=window_end - timedelta(hours=24)
+            )
+            # Members that left the window are dropped, along with clusters that have none left
+            for cluster, article_ids in clusters_df.groupby("cluster")["_id"].agg(list).items():
+                state.members[int(cluster)] = article_ids
+            loaded_clusters = set(clusters_df["cluster"])
+            changed_clusters = [cluster for cluster in changed_clusters if cluster in loaded_clusters]
+
+            # Copied clusters are recorded like reused ones, so later runs can reuse them too
+            # and a resume redoes the copy if the run stops before it is checkpointed
+            manifest = self._cluster_manifest(clusters_df)
+            for cluster in unchanged_clusters:
+                article_ids = state.members[int(cluster)]
+                manifest[cluster] = {
+                    'articleIds': article_ids,
+                    'membershipHash': self._membership_hash(article_ids),
+                    'reusedFrom': {'version': state.version, 'cluster': cluster}
+                }
+            await self.mongodb.create_digest_run(version, request_id, manifest, base_version=state.version)
+            copied = await self._copy_reused_digests(
+                state.version, version, {cluster: cluster for cluster in unchanged_clusters}, request_id
+            )
+            completed = await self._run_cluster_jobs(clusters_df, changed_clusters, request_id, version)
+            status = "completed" if completed else "incomplete"
+            await self.mongodb.set_digest_run_status(version, status)
+
+            # Failed clusters have no digests in this version, so the next run must not copy
+            # from it; keeping the previous state makes it place these articles again
+            if completed:
+                state.version = version
+                state.window_end = window_end
+                await asyncio.to_thread(self.cluster_state_store.save, state)
+                await self._publish_version(version)
+            await self._save_timing_report(trace, version, request_id, status)
 
-            # Wait for all cluster jobs to complete
-            await asyncio.gather(*tasks)
-            
             logger.info(
-                "Completed batch digest processing",
+                "Completed incremental digest processing",
                 extra={
                     "request_id": request_id,
                     "version": version,
-                    "total_clusters_processed": len(unique_clusters)
+                    "new_articles": len(assigned_df),
+                    "changed_clusters": len(changed_clusters),
+                    "copied_digests": copied,
+                    "drift": state.drift
                 }
             )
-        except Exception as e:
+        except (Exception, asyncio.CancelledError) as e:
             logger.error(
-                "Batch digest processing failed",
+                "Incremental digest processing failed",
                 extra={
                     "request_id": request_id,
                     "version": version,
                     "error": str(e)
                 }
             )
+            await self._fail_digest_run(version)
+            await self._save_timing_report(trace, version, request_id, "failed")
             raise
+        finally:
+            trace.close()
+
+    async def claim_resume(self, version: int) -> bool:
+        """
+        Mark an incomplete or failed run as running again, so a single resume owns it.
+
+        A running run whose manifest was not updated for RUN_LEASE_SECONDS is claimed
+        too: its worker died without marking it failed.
+
+        Returns:
+            bool: Whether the run was claimed; False when it is running or completed,
+            or when another resume claimed it first
+        """
+        return await self.mongodb.claim_digest_run(
+            version,
+            RESUMABLE_RUN_STATUSES,
+            stale_before=datetime.utcnow() - timedelta(seconds=RUN_LEASE_SECONDS)
+        )
+
+    @track_in_progress(BATCH_RUNS_IN_PROGRESS.labels("resume"))
+    async def resume_batch_digest(self, version: int, request_id: str) -> None:
+        """
+        Resume a batch digest run from its manifest.
+
+        Only clusters that are not done are processed again; digests they stored
+        before the interruption are deleted first so no section is duplicated.
+        Clusters the run reused from an earlier version are copied again.
+
+        Args:
+            version: Version of the run to resume
+            request_id: Request ID for logging correlation
+
+        Raises:
+            ValueError: If the version has no run manifest
+        """
+        run = await self.mongodb.get_digest_run(version)
+        if run is None:
+            raise ValueError(f"Digest run not found: {version}")
+
+        remaining = {
+            cluster: info
+            for cluster, info in run['clusters'].items()
+            if info['status'] != 'done'
+        }
+        # Clusters copied from an earlier version are copied again instead of regenerated
+        reused: Dict[int, Dict[str, str]] = {}
+        for cluster, info in remaining.items():
+            if 'reusedFrom' in info:
+                reused.setdefault(info['reusedFrom']['version'], {})[cluster] = info['reusedFrom']['cluster']
+        to_generate = {
+            int(cluster): info['articleIds']
+            for cluster, info in remaining.items()
+            if 'reusedFrom' not in info
+        }
+        logger.info(
+            "Resuming batch digest",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "total_clusters": len(run['clusters']),
+                "remaining_clusters": len(remaining),
+                "reused_clusters": len(remaining) - len(to_generate)
+            }
+        )
+
+        trace = start_trace("batch_digest", mode="resume", version=version)
+        try:
+            status = "completed"
+            deleted = 0
+            if remaining:
+                await self.mongodb.set_digest_run_status(version, "running")
+                deleted = await self.mongodb.delete_digests(version, list(remaining))
+                for from_version, clusters in reused.items():
+                    await self._copy_reused_digests(from_version, version, clusters, request_id)
+                completed = True
+                if to_generate:
+                    clusters_df = await self._load_cluster_articles(to_generate, version)
+                    completed = await self._run_cluster_jobs(clusters_df, list(to_generate), request_id, version)
+                status = "completed" if completed else "incomplete"
+            await self.mongodb.set_digest_run_status(version, status)
+
+            if status == "completed":
+                await self._publish_version(version)
+            await self._save_timing_report(trace, version, request_id, status)
+            logger.info(
+                "Resumed batch digest",
+                extra={
+                    "request_id": request_id,
+                    "version": version,
+                    "processed_clusters": len(remaining),
+                    "deleted_partial_digests": deleted
+                }
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            logger.error(
+                "Resuming batch digest failed",
+                extra={
+                    "request_id": request_id,
+                    "version": version,
+                    "error": str(e)
+                }
+            )
+            await self._fail_digest_run(version)
+            await self._save_timing_report(trace, version, request_id, "failed")
+            raise
+        finally:
+            trace.close()
+
+    async def get_run_progress(self, version: int) -> Dict[str, Any]:
+        """
+        Get the progress of a batch digest run.
+
+        Returns:
+            Dict with the run status, cluster counts per status and the stored digests
+            of the version (see MongoDBService.get_digest_status)
+
+        Raises:
+            ValueError: If the version has no run manifest
+        """
+        run = await self.mongodb.get_digest_run(version)
+        if run is None:
+            raise ValueError(f"Digest run not found: {version}")
+
+        statuses = [info['status'] for info in run['clusters'].values()]
+        reused = sum(1 for info in run['clusters'].values() if 'reusedFrom' in info)
+        return {
+            'version': version,
+            'request_id': run['requestId'],
+            'base_version': run.get('baseVersion'),
+            'status': run['status'],
+            'created_at': run['createdAt'],
+            'updated_at': run['updatedAt'],
+            'clusters': {
+                'total': len(statuses),
+                'pending': statuses.count('pending'),
+                'done': statuses.count('done'),
+                'failed': statuses.count('failed'),
+                'reused': reused
+            },
+            'reuse_rate': round(reused / len(statuses), 3) if statuses else 0.0,
+            'digests': await self.mongodb.get_digest_status(version)
+        }
+
+    async def get_timing_report(self, version: int) -> Dict[str, Any]:
+        """
+        Get the timing report of the latest run (or resume) of a version.
+
+        Returns:
+            Dict with the run's request ID, status and creation time and the trace
+            summary: stage durations, critical path, cluster totals, slowest
+            clusters and retry counters (see Trace.report)
+
+        Raises:
+            ValueError: If the version has no timing report
+        """
+        timing = await self.mongodb.get_digest_timing(version)
+        if timing is None:
+            raise ValueError(f"Digest timing report not found: {version}")
+        return {
+            'version': version,
+            'request_id': timing['requestId'],
+            'status': timing['status'],
+            'created_at': timing['createdAt'],
+            **timing['report']
+        }
+
+    async def _save_timing_report(self, trace: Trace, version: int, request_id: str, status: str) -> None:
+        """End the run's trace and store its report; a failure to store it is logged, not raised."""
+        trace.close()
+        report = trace.report()
+        logger.info(
+            "Batch digest timings",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "status": status,
+                "total_seconds": report['total_seconds'],
+                "stages": report['stages']
+            }
+        )
+        try:
+            await self.mongodb.save_digest_timing(version, request_id, status, report)
+        except Exception as e:
+            logger.error(
+                "Failed to store digest timing report",
+                extra={
+                    "version": version,
+                    "error": str(e)
+                }
+            )
+
+    async def _fail_digest_run(self, version: int) -> None:
+        """Mark a run failed, if its manifest was already stored."""
+        try:
+            await self.mongodb.set_digest_run_status(version, "failed")
+        except Exception as e:
+            logger.error(
+                "Failed to update digest run status",
+                extra={
+                    "version": version,
+                    "error": str(e)
+                }
+            )
+
+    @traced("match_clusters")
+    async def _find_reusable_clusters(self, manifest: Dict[str, Dict[str, Any]],
+                                      version: int) -> Tuple[Optional[int], Dict[str, str]]:
+        """
+        Match clusters against the done clusters of the previous run.
+
+        Returns:
+            (previous version, previous cluster ID per matched cluster ID)
+        """
+        if not DIGEST_REUSE_ENABLED:
+            return None, {}
+        previous_run = await self.mongodb.get_previous_digest_run(version)
+        if previous_run is None:
+            return None, {}
+        previous = {
+            cluster: entry
+            for cluster, entry in previous_run['clusters'].items()
+            if entry['status'] == 'done'
+        }
+        return previous_run['version'], self._match_clusters(manifest, previous, DIGEST_REUSE_JACCARD_THRESHOLD)
+
+    @traced("reuse_digests")
+    async def _copy_reused_digests(self, from_version: int, version: int, reused: Dict[str, str],
+                                   request_id: str) -> int:
+        """
+        Copy the digests of matched previous clusters into version and checkpoint them.
+
+        Returns:
+            int: Number of copied digests
+        """
+        if not reused:
+            return 0
+        copied = await self.mongodb.copy_digests(
+            from_version, version, list(reused.values()),
+            {previous_cluster: cluster for cluster, previous_cluster in reused.items()}
+        )
+        await self.mongodb.update_digest_run_clusters(version, {cluster: 'done' for cluster in reused})
+        logger.info(
+            "Reused cluster digests",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "from_version": from_version,
+                "reused_clusters": len(reused),
+                "copied_digests": copied
+            }
+        )
+        return copied
+
+    @staticmethod
+    def _match_clusters(current: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]],
+                        threshold: float) -> Dict[str, str]:
+        """
+        Pair current clusters with previous clusters of the same members.
+
+        Clusters are first paired by membership hash. When threshold is below 1, each
+        remaining cluster is paired with the previous cluster of highest Jaccard
+        similarity, if it reaches threshold. A previous cluster is used at most once.
+        """
+        by_hash = {
+            entry.get('membershipHash') or DigestService._membership_hash(entry['articleIds']): cluster
+            for cluster, entry in previous.items()
+        }
+        matches: Dict[str, str] = {}
+        used = set()
+        for cluster, entry in current.items():
+            previous_cluster = by_hash.get(entry['membershipHash'])
+            if previous_cluster is not None and previous_cluster not in used:
+                matches[cluster] = previous_cluster
+                used.add(previous_cluster)
+        if threshold >= 1:
+            return matches
+
+        article_cluster = {
+            article_id: previous_cluster
+            for previous_cluster, entry in previous.items()
+            if previous_cluster not in used
+            for article_id in entry['articleIds']
+        }
+        for cluster, entry in current.items():
+            if cluster in matches:
+                continue
+            overlaps = Counter(article_cluster[a] for a in entry['articleIds'] if a in article_cluster)
+            best_cluster, best_score = None, threshold
+            for previous_cluster, shared in overlaps.items():
+                if previous_cluster in used:
+                    continue
+                union = len(entry['articleIds']) + len(previous[previous_cluster]['articleIds']) - shared
+                if shared / union >= best_score:
+                    best_cluster, best_score = previous_cluster, shared / union
+            if best_cluster is not None:
+                matches[cluster] = best_cluster
+                used.add(best_cluster)
+        return matches
+
+    @staticmethod
+    def _membership_hash(article_ids: List[Any]) -> str:
+        """Hash of a cluster's members, independent of their order."""
+        return hashlib.sha256("\n".join(sorted(str(a) for a in article_ids)).encode()).hexdigest()
+
+    @staticmethod
+    def _cluster_manifest(clusters_df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+        """Run manifest entry per cluster, keyed by the cluster ID as stored on digests."""
+        return {
+            str(cluster): {'articleIds': ids, 'membershipHash': DigestService._membership_hash(ids)}
+            for cluster, ids in clusters_df.groupby("cluster")["_id"].agg(list).items()
+        }
+
+    @traced("publish_version")
+    async def _publish_version(self, version: int) -> None:
+        """
+        Prepare retrieval for a freshly completed version: materialize reader rankings
+        and load the local digest index when either is in use.
+
+        Never raises: the run is already marked completed when this is called, and a
+        failure here must not turn it into a failed run.
+        """
+        try:
+            if DIGEST_RETRIEVAL_BACKEND == "local" or MATERIALIZE_READER_DIGESTS:
+                await self.digest_index.load(version)
+        except Exception as e:
+            # The index is loaded again on the first request that needs it
+            logger.error(
+                "Digest index load failed",
+                extra={
+                    'version': version,
+                    'error': str(e)
+                }
+            )
+            return
+        if MATERIALIZE_READER_DIGESTS:
+            try:
+                await self.materialize_reader_digests(version)
+            except Exception as e:
+                # Readers fall back to live search, the version itself is complete
+                logger.error(
+                    "Reader digests materialization failed",
+                    extra={
+                        'version': version,
+                        'error': str(e)
+                    }
+                )
+
+    @traced("materialize_reader_digests")
+    async def materialize_reader_digests(self, version: int) -> int:
+        """
+        Rank every reader against the digests of version and store the rankings.
+
+        Reader embeddings are streamed and ranked READER_DIGESTS_CHUNK_SIZE readers at
+        a time with one matrix product per chunk; each chunk is written with one bulk
+        upsert. Rankings of older versions are deleted afterwards.
+
+        Returns:
+            int: Number of readers ranked
+        """
+        started = time.perf_counter()
+        await self.digest_index.ensure_version(version)
+
+        total = 0
+        reader_ids: List[str] = []
+        queries: List[np.ndarray] = []
+
+        async def flush() -> None:
+            rankings = self.digest_index.search_many(np.vstack(queries), DIGEST_RETRIEVAL_LIMIT)
+            await self.mongodb.upsert_reader_digests(version, dict(zip(reader_ids, rankings)))
+
+        async for reader_id, embeddings in self.mongodb.stream_readers_embeddings(READER_DIGESTS_CHUNK_SIZE):
+            if embeddings is None or len(embeddings) == 0:
+                continue
+            reader_ids.append(reader_id)
+            queries.append(embeddings)
+            if len(reader_ids) >= READER_DIGESTS_CHUNK_SIZE:
+                await flush()
+                total += len(reader_ids)
+                reader_ids, queries = [], []
+        if reader_ids:
+            await flush()
+            total += len(reader_ids)
+
+        deleted = await self.mongodb.delete_reader_digests_before(version)
+        logger.info(
+            "Reader digests materialized",
+            extra={
+                'version': version,
+                'total': total,
+                'deleted': deleted,
+                'seconds': round(time.perf_counter() - started, 3)
+            }
+        )
+        return total
+
+    def _needs_full_recluster(self, state: Optional[ClusterState]) -> bool:
+        """Check whether the persisted cluster state is missing or too old to extend."""
+        if state is None or state.version is None:
+            return True
+        return datetime.utcnow() - state.fitted_at > timedelta(hours=CLUSTER_STATE_MAX_AGE_HOURS)
+
+    @traced("load_cluster_articles")
+    async def _load_cluster_articles(self, members: Dict[int, List[Any]], version: int,
+                                     since: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Load the given member articles of each cluster, labelled with their cluster.
+        With since, members created before it are left out.
+        """
+        import pandas as pd
+
+        article_cluster = {
+            article_id: cluster
+            for cluster, article_ids in members.items()
+            for article_id in article_ids
+        }
+        match: Dict[str, Any] = {'_id': {'$in': list(article_cluster)}}
+        if since is not None:
+            match['createdAt'] = {'$gte': since}
+        # Cluster jobs work on the metadata only
+        projection = {field: value for field, value in ARTICLE_PROJECTION.items() if field != 'embeddings'}
+        articles = await self.mongodb.aggregate_articles([
+            {'$match': match},
+            {'$project': projection}
+        ])
+        # An empty result has no columns to label
+        clusters_df = pd.DataFrame(articles, columns=list(projection) if not articles else None)
+        clusters_df["cluster"] = clusters_df["_id"].map(article_cluster)
+        clusters_df["version"] = version
+        return clusters_df
+
+    @traced("cluster_jobs")
+    async def _run_cluster_jobs(self, clusters_df: pd.DataFrame, clusters: List[Any],
+                                request_id: str, version: int) -> bool:
+        """
+        Run one process_cluster_job per cluster, CLUSTER_JOB_CONCURRENCY at a time, and
+        log a summary of failed and timed out jobs and of throttled and retried API calls.
+
+        Clusters are checkpointed in the run manifest: done once their digests are
+        flushed, failed when their job or their digests' insertion fails.
+
+        Returns:
+            bool: Whether every cluster is done
+        """
+        logger.info(
+            "Launching cluster jobs",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "total_clusters": len(clusters)
+            }
+        )
+
+        failed_clusters = set()
+
+        async def checkpoint(digests: List[Dict[str, Any]], result: Optional[Dict[str, Any]]) -> None:
+            statuses = {}
+            for i, digest in enumerate(digests):
+                if result is None or result['inserted_ids'][i] is None:
+                    statuses[digest['cluster']] = 'failed'
+                    failed_clusters.add(digest['cluster'])
+                else:
+                    statuses.setdefault(digest['cluster'], 'done')
+            await self.mongodb.update_digest_run_clusters(version, statuses)
+
+        # Digests of all clusters are written in shared bulk inserts
+        digest_writer = DigestWriteBuffer(self.mongodb, on_flush=checkpoint)
+        semaphore = asyncio.Semaphore(CLUSTER_JOB_CONCURRENCY)
+        llm_before, embedding_before = llm_rate_limiter.stats(), embedding_rate_limiter.stats()
+
+        async def run_job(cluster: Any) -> str:
+            cluster_df = clusters_df[clusters_df["cluster"] == cluster]
+            async with semaphore:
+                try:
+                    with CLUSTER_JOBS_IN_PROGRESS.track_inprogress():
+                        succeeded = await asyncio.wait_for(
+                            self.process_cluster_job(cluster_df, request_id, digest_writer),
+                            CLUSTER_JOB_TIMEOUT_SECONDS
+                        )
+                except asyncio.TimeoutError:
+                    logger.error(
+                        "Cluster job timed out",
+                        extra={
+                            "request_id": request_id,
+                            "cluster": cluster,
+                            "version": version,
+                            "timeout_seconds": CLUSTER_JOB_TIMEOUT_SECONDS
+                        }
+                    )
+                    return "timed_out"
+            return "succeeded" if succeeded else "failed"
+
+        # Create tasks for each cluster
+        tasks = [asyncio.create_task(run_job(cluster)) for cluster in clusters]
+
+        # Wait for all cluster jobs to complete
+        try:
+            outcomes = await asyncio.gather(*tasks)
+        finally:
+            await digest_writer.close()
+
+        failed_jobs = {str(cluster) for cluster, outcome in zip(clusters, outcomes) if outcome != "succeeded"}
+        await self.mongodb.update_digest_run_clusters(version, {cluster: 'failed' for cluster in failed_jobs})
+        failed_clusters |= failed_jobs
+
+        llm_after, embedding_after = llm_rate_limiter.stats(), embedding_rate_limiter.stats()
+        logger.info(
+            "Cluster jobs summary",
+            extra={
+                "request_id": request_id,
+                "version": version,
+                "total_clusters": len(clusters),
+                "succeeded": outcomes.count("succeeded"),
+                "failed": outcomes.count("failed"),
+                "timed_out": outcomes.count("timed_out"),
+                "llm_throttled": llm_after['throttled'] - llm_before['throttled'],
+                "llm_retried": llm_after['retried'] - llm_before['retried'],
+                "llm_failed": llm_after['failed'] - llm_before['failed'],
+                "embeddings_throttled": embedding_after['throttled'] - embedding_before['throttled'],
+                "embeddings_retried": embedding_after['retried'] - embedding_before['retried'],
+                "embeddings_failed": embedding_after['failed'] - embedding_before['failed'],
+                "digests_inserted": digest_writer.inserted,
+                "digests_failed": digest_writer.failed
+            }
+        )
+        return not failed_clusters
 
     async def get_daily_digest(self, reader_id: str) -> List[str]:
         """
@@ -370,21 +1242,31 @@ class DigestService(BaseService):
         Returns:
             List of digest IDs (as strings) relevant for the reader
         """
+        latest_version = await self.mongodb.get_latest_digest_version()
+
+        # Rankings materialized at the end of the batch; readers created since fall back to live search
+        if MATERIALIZE_READER_DIGESTS:
+            digest_ids = await self.mongodb.get_reader_digests(reader_id, latest_version)
+            if digest_ids is not None:
+                return digest_ids
+
         # Get reader profile
         reader = await self.mongodb.get_reader(reader_id)
-        
-        latest_version = await self.mongodb.get_latest_digest_version()
+
+        if DIGEST_RETRIEVAL_BACKEND == "local":
+            await self.digest_index.ensure_version(latest_version)
+            return self.digest_index.search(reader['embeddings'], DIGEST_RETRIEVAL_LIMIT)
 
         vector_search = {
             '$vectorSearch': {
                 'index': 'digest_embeddings',
                 'path': 'embeddings',
-                'queryVector': reader['embeddings'],
+                'queryVector': reader['embeddings'].tolist(),
                 'filter': {
                     'version': latest_version
                 },
                 'numCandidates': 400,
-                'limit': 100 
+                'limit': DIGEST_RETRIEVAL_LIMIT
             }
         }
 
@@ -398,4 +1280,53 @@ class DigestService(BaseService):
         ]
         
         daily_digest = await self.mongodb.aggregate_digests(pipeline)
-        return [str(doc['_id']) for doc in daily_digest]  # Return array of string IDs 
\ No newline at end of file
+        return [str(doc['_id']) for doc in daily_digest]  # Return array of string IDs
+
+    async def get_daily_digests(self, reader_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get the daily digest of many readers at once.
+
+        Readers are fetched with one query and the latest version is resolved once. All
+        readers are then ranked against the local digest index in a single matrix product,
+        whatever DIGEST_RETRIEVAL_BACKEND is set to.
+
+        Args:
+            reader_ids: IDs of the readers
+
+        Returns:
+            List aligned with reader_ids, where each item is either
+            {"reader_id": ..., "result": <list of digest IDs>, "error": None} or
+            {"reader_id": ..., "result": None, "error": <error message>}
+        """
+        readers_embeddings = await self.mongodb.get_readers_embeddings(reader_ids)
+        latest_version = await self.mongodb.get_latest_digest_version()
+        await self.digest_index.ensure_version(latest_version)
+
+        results = []
+        ranked_ids = []
+        for reader_id in reader_ids:
+            embeddings = readers_embeddings.get(reader_id)
+            if reader_id not in readers_embeddings:
+                results.append({"reader_id": reader_id, "result": None, "error": f"Reader not found: {reader_id}"})
+            elif embeddings is None or len(embeddings) == 0:
+                results.append({"reader_id": reader_id, "result": None, "error": f"Reader has no embeddings: {reader_id}"})
+            else:
+                results.append({"reader_id": reader_id, "result": None, "error": None})
+                ranked_ids.append(reader_id)
+
+        if ranked_ids:
+            queries = np.vstack([readers_embeddings[reader_id] for reader_id in ranked_ids])
+            rankings = dict(zip(ranked_ids, self.digest_index.search_many(queries, DIGEST_RETRIEVAL_LIMIT)))
+            for item in results:
+                if item["error"] is None:
+                    item["result"] = rankings[item["reader_id"]]
+
+        logger.info(
+            "Daily digests ranked",
+            extra={
+                'total': len(reader_ids),
+                'failed': sum(1 for item in results if item["error"] is not None),
+                'version': latest_version
+            }
+        )
+        return results
@@ -0,0 +1,83 @@
+from typing import List, Optional
+import asyncio
+import time
+import numpy as np
+from .mongodb import MongoDBService
+from ..utils.logger import logger
+
+class DigestIndex:
+    """
+    In-process cosine index over the digests of one version.
+
+    Digest embeddings are loaded into a row-normalized float32 matrix, so a query is
+    a single matrix-vector product. The digests of a version never change, so the
+    matrix is only reloaded when another version is requested.
+    """
+
+    def __init__(self, mongodb: MongoDBService):
+        self.mongodb = mongodb
+        self.version: Optional[int] = None
+        self.digest_ids: List[str] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._lock = asyncio.Lock()
+
+    async def ensure_version(self, version: int) -> None:
+        """Load the digests of version unless they are already indexed."""
+        if self.version == version:
+            return
+        async with self._lock:
+            if self.version != version:
+                await self.load(version)
+
+    async def load(self, version: int) -> None:
+        """Replace the index with the digests of version."""
+        started = time.perf_counter()
+        digests = await self.mongodb.aggregate_digests([
+            {'$match': {'version': version, 'embeddings': {'$ne': None}}},
+            {'$project': {'_id': 1, 'embeddings': 1}}
+        ])
+
+        digest_ids = [str(digest['_id']) for digest in digests]
+        if digests:
+            matrix = np.vstack([digest['embeddings'] for digest in digests]).astype(np.float32, copy=False)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        # Swap in one step so concurrent searches see either the old or the new version
+        self.matrix, self.digest_ids, self.version = matrix, digest_ids, version
+        logger.info(
+            "Digest index loaded",
+            extra={
+                'version': version,
+                'total': len(digest_ids),
+                'seconds': round(time.perf_counter() - started, 3)
+            }
+        )
+
+    def search(self, embeddings: np.ndarray, limit: int) -> List[str]:
+        """Return the IDs of the limit digests most similar to embeddings, best first."""
+        return self.search_many(np.asarray(embeddings, dtype=np.float32)[np.newaxis, :], limit)[0]
+
+    def search_many(self, queries: np.ndarray, limit: int) -> List[List[str]]:
+        """
+        Rank the digests for every row of queries with one matrix product.
+
+        Returns:
+            One list of digest IDs per query row, best first, at most limit long
+        """
+        matrix, digest_ids = self.matrix, self.digest_ids
+        if not digest_ids:
+            return [[] for _ in range(len(queries))]
+
+        # Query norms do not change the order within a row, so only digests are normalized
+        scores = np.asarray(queries, dtype=np.float32) @ matrix.T
+        limit = min(limit, len(digest_ids))
+        if limit < len(digest_ids):
+            top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        else:
+            top = np.broadcast_to(np.arange(len(digest_ids)), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        return [[digest_ids[i] for i in row] for row in top]
@@ -0,0 +1,101 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+from .mongodb import MongoDBService
+from ..utils.logger import logger
+from ..utils.tracing import activate, current_span
+
+# A buffer flushes once it holds DIGEST_WRITE_BATCH_SIZE digests, or
+# DIGEST_WRITE_FLUSH_SECONDS after the first digest of the next batch was added
+DIGEST_WRITE_BATCH_SIZE = int(os.getenv("DIGEST_WRITE_BATCH_SIZE", "200"))
+DIGEST_WRITE_FLUSH_SECONDS = float(os.getenv("DIGEST_WRITE_FLUSH_SECONDS", "2"))
+
+class DigestWriteBuffer:
+    """
+    Collects digests from concurrent cluster jobs and writes them with
+    MongoDBService.insert_digests, flushing by size or after a delay.
+
+    Flush failures are logged and counted, never raised, so one failed write does
+    not fail the cluster jobs sharing the buffer. After every flush, on_flush is
+    awaited with the flushed digests and their insert_digests result (None when
+    the whole write failed).
+    """
+
+    def __init__(self, mongodb: MongoDBService, batch_size: int = DIGEST_WRITE_BATCH_SIZE,
+                 flush_seconds: float = DIGEST_WRITE_FLUSH_SECONDS,
+                 on_flush: Optional[Callable[[List[Dict[str, Any]], Optional[Dict[str, Any]]], Awaitable[None]]] = None):
+        self.mongodb = mongodb
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.on_flush = on_flush
+        self.inserted = 0
+        self.failed = 0
+        self.flushes = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        # Flushes carry digests of several jobs, so their spans go under the creator's span
+        self._span = current_span.get()
+
+    async def add(self, digests: List[Dict[str, Any]]) -> None:
+        """Buffer digests, flushing when the buffer is full."""
+        self._buffer.extend(digests)
+        if len(self._buffer) >= self.batch_size:
+            # A cancelled caller must not abort a write that carries other jobs' digests
+            await asyncio.shield(self.flush())
+        elif self._buffer and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Write every buffered digest."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            self.flushes += 1
+            result = None
+            try:
+                with activate(self._span):
+                    result = await self.mongodb.insert_digests(batch)
+                self.failed += len(result['errors'])
+                self.inserted += len(batch) - len(result['errors'])
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(
+                    "Digest buffer flush failed",
+                    extra={
+                        'total': len(batch),
+                        'error': str(e)
+                    }
+                )
+
+            if self.on_flush is not None:
+                try:
+                    await self.on_flush(batch, result)
+                except Exception as e:
+                    logger.error(
+                        "Digest buffer flush callback failed",
+                        extra={
+                            'total': len(batch),
+                            'error': str(e)
+                        }
+                    )
+
+    async def close(self) -> None:
+        """Flush what is left and stop the flush timer."""
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'flushes': self.flushes
+        }
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_seconds)
+        await self.flush()
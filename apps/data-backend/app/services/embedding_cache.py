@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import hashlib
+import numpy as np
+import os
+import sqlite3
+import threading
+from ..utils.logger import logger
+
+# Embedding cache settings; an empty EMBEDDING_CACHE_PATH disables the on-disk tier
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "2048"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Keys are hashes of (model, dimensions, instruction text). Vectors are kept as
+    float32 in a bounded in-memory LRU backed by a SQLite file that survives restarts.
+    """
+
+    def __init__(self, max_items: int, path: Optional[str]):
+        self.max_items = max_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite I/O runs in threads under its own lock, so in-memory lookups never wait on it
+        self._db_lock = threading.Lock()
+        self._db = self._open_db(path) if path else None
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0
+        }
+
+    @staticmethod
+    def make_key(model: str, dimensions: Optional[int], text: str) -> str:
+        """Build the cache key for an embedding request."""
+        return hashlib.sha256(f"{model}\x00{dimensions}\x00{text}".encode()).hexdigest()
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for every key found in either tier."""
+        found: Dict[str, np.ndarray] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self._counters['memory_hits'] += len(found)
+
+        from_disk = {}
+        if missing and self._db is not None:
+            try:
+                from_disk = await asyncio.to_thread(self._read_disk, missing)
+            except Exception as e:
+                # A failed read is a miss; the caller embeds the texts again
+                logger.error(
+                    "Embedding cache disk read failed",
+                    extra={
+                        'keys': len(missing),
+                        'error': str(e)
+                    }
+                )
+            found.update(from_disk)
+
+        with self._lock:
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+            self._counters['disk_hits'] += len(from_disk)
+            self._counters['misses'] += len(missing) - len(from_disk)
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    async def put_many(self, items: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        """
+        Store vectors in both tiers and return them as stored.
+
+        The returned vectors are rounded to float32 like every later hit, so a text
+        embeds to the same values whether it was a miss or a hit.
+        """
+        vectors = {key: np.asarray(vector, dtype=np.float32) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, vectors)
+            except Exception as e:
+                # The vectors are already paid for and kept in memory; losing the disk copy is fine
+                logger.error(
+                    "Embedding cache disk write failed",
+                    extra={
+                        'keys': len(vectors),
+                        'error': str(e)
+                    }
+                )
+        return {key: vector.tolist() for key, vector in vectors.items()}
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters for both tiers."""
+        with self._lock:
+            lookups = sum(self._counters.values())
+            hits = self._counters['memory_hits'] + self._counters['disk_hits']
+            return {
+                **self._counters,
+                'memory_entries': len(self._memory),
+                'hit_rate': hits / lookups if lookups else 0.0
+            }
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        # Called with self._lock held
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _open_db(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            db.commit()
+            return db
+        except Exception as e:
+            logger.error(
+                "Embedding cache disk tier unavailable",
+                extra={
+                    'path': path,
+                    'error': str(e)
+                }
+            )
+            return None
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._db_lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _write_disk(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._db_lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in vectors.items()]
+                )
+                self._db.commit()
+            except Exception:
+                # Do not leave a half-written transaction open for the next write
+                self._db.rollback()
+                raise
+
+# Shared by every BaseService in the process
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_MEMORY_ITEMS, EMBEDDING_CACHE_PATH)
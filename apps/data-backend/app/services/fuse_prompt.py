@@ -1,6 +1,15 @@
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from langfuse import Langfuse
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional, Tuple
+import os
+import threading
+import time
+from ..utils.logger import logger
+
+# Prompt cache settings
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
+PROMPT_CACHE_REFRESH_RATIO = float(os.getenv("PROMPT_CACHE_REFRESH_RATIO", "0.8"))
 
 class PromptName(Enum):
     CLUSTER_DIGEST = "cluster_digest"
@@ -13,13 +22,129 @@ class PromptName(Enum):
     READER_EMBEDDINGS = "reader_embedder_general"
     ARTICLE_EMBEDDINGS = "article_embedder"
 
+PromptKey = Tuple[PromptName, Optional[str], Optional[int]]
+
+class PromptCache:
+    """
+    In-process TTL cache for Langfuse prompts.
+
+    Entries are refreshed in the background once they reach
+    refresh_ratio * ttl_seconds. Expired entries keep being served while a refresh
+    is pending or after it failed, so only the very first lookup of a key blocks.
+    """
+
+    def __init__(self, ttl_seconds: float, refresh_ratio: float):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after = ttl_seconds * refresh_ratio
+        self._entries: Dict[PromptKey, Tuple[Any, float]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prompt-refresh")
+        self._counters = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_failures': 0
+        }
+
+    def get(self, key: PromptKey, fetch: Callable[[], Any]) -> Any:
+        """Return the cached prompt for key, fetching it synchronously only on a cold miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._count('misses')
+            return self.load(key, fetch)
+
+        prompt, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if age >= self.refresh_after:
+            self._schedule_refresh(key, fetch)
+        self._count('hits' if age < self.ttl_seconds else 'stale_hits')
+        return prompt
+
+    def load(self, key: PromptKey, fetch: Callable[[], Any]) -> Any:
+        """Fetch a prompt and store it in the cache."""
+        prompt = fetch()
+        with self._lock:
+            self._entries[key] = (prompt, time.monotonic())
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached prompts."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['stale_hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'hit_rate': (lookups - self._counters['misses']) / lookups if lookups else 0.0
+            }
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _schedule_refresh(self, key: PromptKey, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key: PromptKey, fetch: Callable[[], Any]) -> None:
+        try:
+            self.load(key, fetch)
+            self._count('refreshes')
+        except Exception as e:
+            self._count('refresh_failures')
+            logger.error(
+                "Prompt refresh failed, serving last good prompt",
+                extra={
+                    'prompt_name': key[0].value,
+                    'error': str(e)
+                }
+            )
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+# Shared by every FusePromptFacade in the process
+prompt_cache = PromptCache(PROMPT_CACHE_TTL_SECONDS, PROMPT_CACHE_REFRESH_RATIO)
+
 class FusePromptFacade:
     def __init__(self):
         self.langfuse = Langfuse()
 
-    def get_prompt(self, prompt_name: PromptName) -> Any:
-        return self.langfuse.get_prompt(prompt_name.value)
+    def get_prompt(self, prompt_name: PromptName, label: Optional[str] = None, version: Optional[int] = None) -> Any:
+        return prompt_cache.get(
+            (prompt_name, label, version),
+            lambda: self._fetch_prompt(prompt_name, label, version)
+        )
+
+    def warm_up(self) -> None:
+        """Preload every PromptName into the prompt cache."""
+        for prompt_name in PromptName:
+            try:
+                prompt_cache.load(
+                    (prompt_name, None, None),
+                    lambda: self._fetch_prompt(prompt_name, None, None)
+                )
+            except Exception as e:
+                logger.error(
+                    "Prompt warm-up failed",
+                    extra={
+                        'prompt_name': prompt_name.value,
+                        'error': str(e)
+                    }
+                )
+        logger.info(
+            "Prompt cache warmed up",
+            extra=prompt_cache.stats()
+        )
+
+    def _fetch_prompt(self, prompt_name: PromptName, label: Optional[str], version: Optional[int]) -> Any:
+        # Langfuse's own cache is disabled so refreshes always reach the server
+        return self.langfuse.get_prompt(prompt_name.value, version=version, label=label, cache_ttl_seconds=0)
 
     @staticmethod
     def compile_prompt(prompt: Any, **kwargs) -> str:
-        return prompt.compile(**kwargs) 
\ No newline at end of file
+        return prompt.compile(**kwargs)
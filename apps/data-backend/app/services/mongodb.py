@@ -1,53 +1,188 @@
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
+from datetime import datetime
+import asyncio
 import os
+import time
 from ..utils.logger import logger
+from ..utils.bson_vectors import decode_vector, encode_float32_vector
+from ..utils.metrics import MONGO_OPERATION_SECONDS, observe_mongo
+from ..utils.tracing import traced
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from dotenv import load_dotenv
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
 
 load_dotenv()
 
-class MongoDBService:
+# How embeddings are written: "array" (BSON array of doubles) or "binary" (packed float32).
+# Reads always accept both formats.
+EMBEDDING_STORAGE_FORMAT = os.getenv("EMBEDDING_STORAGE_FORMAT", "array")
+
+# Connection pool and timeouts of the MongoDB client shared by the process; 0 leaves a
+# timeout unset (no limit)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "0"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "20000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "0"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "0"))
+
+# Indexes created at startup, by collection, with the queries they serve
+INDEXES: Dict[str, List[IndexModel]] = {
+    "articles": [
+        # Article window of a batch run (stream_articles, count_articles)
+        IndexModel([("createdAt", 1)]),
+        # get_articles_by_topic
+        IndexModel([("topics", 1)])
+    ],
+    "digests": [
+        # The digests of a version, and the latest version when no run has a manifest
+        IndexModel([("version", -1), ("createdAt", -1)]),
+        # Copying and deleting the digests of some clusters of a version
+        IndexModel([("version", 1), ("cluster", 1)])
+    ],
+    "digest_runs": [
+        # Run manifests, and the latest completed version (scanned backwards)
+        IndexModel([("version", 1)], unique=True)
+    ],
+    "digest_timings": [
+        IndexModel([("version", 1), ("createdAt", -1)])
+    ],
+    "reader_digests": [
+        IndexModel([("readerId", 1), ("version", 1)], unique=True),
+        IndexModel([("version", 1)])
+    ]
+}
+
+class MongoConnection:
+    """
+    Process-wide AsyncIOMotorClient, so every MongoDBService shares one connection pool.
+
+    The app opens it in its lifespan, which also creates the indexes; scripts get
+    the client on first use.
+    """
+
     def __init__(self):
-        mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        self.client = AsyncIOMotorClient(mongodb_uri)
-        self.db = self.client["bacafe"]
-        self._ensure_indexes()
+        self._client: Optional[AsyncIOMotorClient] = None
 
-    async def _ensure_indexes(self):
-        """Ensure all required indexes exist in MongoDB collections."""
-        try:
-            # Indexes for articles collection
-            await self.db.articles.create_index([("createdAt", 1)])
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                minPoolSize=MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS or None,
+                connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS or None,
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS or None,
+                waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS or None
+            )
+            logger.info(
+                "Created MongoDB client",
+                extra={
+                    'max_pool_size': MONGODB_MAX_POOL_SIZE,
+                    'min_pool_size': MONGODB_MIN_POOL_SIZE
+                }
+            )
+        return self._client
+
+    async def open(self) -> None:
+        """Create the client and the indexes."""
+        await MongoDBService(self.client).ensure_indexes()
+
+    def close(self) -> None:
+        """Close the client; a later use creates a new one."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            logger.info("Closed MongoDB client")
 
-            # Indexes for digests collection
-            await self.db.digests.create_index([("createdAt", 1)])
-            await self.db.digests.create_index([("version", 1)])
-            await self.db.digests.create_index([("cluster", 1)])
+class MongoDBService:
+    def __init__(self, client: Optional[AsyncIOMotorClient] = None):
+        self.client = client if client is not None else mongo_connection.client
+        self.db = self.client["bacafe"]
 
-            logger.info("MongoDB indexes created successfully")
+    async def ensure_indexes(self) -> None:
+        """
+        Create the INDEXES missing from their collections; existing ones are left as they are.
+
+        Raises:
+            Exception: If an index cannot be created, e.g. when MongoDB is unreachable
+        """
+        try:
+            await asyncio.gather(*(
+                self.db[collection].create_indexes(indexes)
+                for collection, indexes in INDEXES.items()
+            ))
+            logger.info(
+                "MongoDB indexes created successfully",
+                extra={
+                    'indexes': sum(len(indexes) for indexes in INDEXES.values())
+                }
+            )
         except Exception as e:
             logger.error(f"Error creating MongoDB indexes: {str(e)}")
             raise
 
+    @staticmethod
+    def _encode_embeddings(document: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert the document's embeddings to the configured storage format."""
+        if EMBEDDING_STORAGE_FORMAT == "binary" and document.get("embeddings") is not None:
+            document = {**document, "embeddings": encode_float32_vector(document["embeddings"])}
+        return document
+
+    @staticmethod
+    def _decode_embeddings(document: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode the document's embeddings, stored as binary or array, into a float32 NumPy array."""
+        if document.get("embeddings") is not None:
+            document["embeddings"] = decode_vector(document["embeddings"])
+        return document
+
+    @observe_mongo("articles", "aggregate")
     async def aggregate_articles(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Execute an aggregation pipeline on the articles collection."""
         try:
             cursor = self.db.articles.aggregate(pipeline)
-            return await cursor.to_list(length=None)
+            return [self._decode_embeddings(doc) for doc in await cursor.to_list(length=None)]
+        except Exception as e:
+            logger.error(f"Error in MongoDB aggregation: {str(e)}")
+            raise
+
+    async def stream_articles(self, pipeline: List[Dict[str, Any]], batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute an aggregation pipeline on the articles collection and yield documents
+        one at a time, fetching batch_size documents per round trip.
+        """
+        started = time.perf_counter()
+        try:
+            cursor = self.db.articles.aggregate(pipeline, batchSize=batch_size)
+            async for doc in cursor:
+                yield self._decode_embeddings(doc)
         except Exception as e:
             logger.error(f"Error in MongoDB aggregation: {str(e)}")
             raise
+        finally:
+            MONGO_OPERATION_SECONDS.labels("articles", "stream").observe(time.perf_counter() - started)
+
+    @observe_mongo("articles", "count")
+    async def count_articles(self, query: Dict[str, Any]) -> int:
+        """Count the articles matching a query."""
+        return await self.db.articles.count_documents(query)
 
+    @observe_mongo("digests", "aggregate")
     async def aggregate_digests(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Execute an aggregation pipeline on the digests collection."""
         try:
             cursor = self.db.digests.aggregate(pipeline)
-            return await cursor.to_list(length=None)
+            return [self._decode_embeddings(doc) for doc in await cursor.to_list(length=None)]
         except Exception as e:
             logger.error(f"Error in MongoDB aggregation: {str(e)}")
             raise
 
+    @observe_mongo("users", "find_one")
     async def get_reader(self, reader_id: str) -> Dict[str, Any]:
         """
         Retrieve a reader by ID from the users collection.
@@ -75,7 +210,7 @@ class MongoDBService:
                     'reader_id': reader_id
                 }
             )
-            return reader
+            return self._decode_embeddings(reader)
             
         except ValueError:
             # Re-raise ValueError for not found cases
@@ -90,15 +225,128 @@ class MongoDBService:
             )
             raise
 
+    @observe_mongo("users", "find")
+    async def get_readers_embeddings(self, reader_ids: List[str]) -> Dict[str, Any]:
+        """
+        Retrieve the embeddings of several readers with a single query.
+
+        Args:
+            reader_ids: Reader IDs as ObjectId strings
+
+        Returns:
+            Dict mapping each found reader ID to its embeddings as a float32 NumPy array
+            (None when the reader has no embeddings). IDs that are not valid ObjectIds
+            or match no reader are left out.
+        """
+        object_ids = [ObjectId(reader_id) for reader_id in reader_ids if ObjectId.is_valid(reader_id)]
+        if not object_ids:
+            return {}
+        try:
+            cursor = self.db.users.find({"_id": {"$in": object_ids}}, {"embeddings": 1})
+            return {
+                str(reader["_id"]): self._decode_embeddings(reader).get("embeddings")
+                async for reader in cursor
+            }
+        except Exception as e:
+            logger.error(
+                "Error retrieving readers",
+                extra={
+                    'total': len(object_ids),
+                    'error': str(e)
+                }
+            )
+            raise
+
+    async def stream_readers_embeddings(self, batch_size: int = 1000) -> AsyncIterator[Any]:
+        """Yield (reader ID, float32 embeddings) for every reader that has embeddings."""
+        try:
+            cursor = self.db.users.find(
+                {"embeddings": {"$ne": None}},
+                {"embeddings": 1}
+            ).batch_size(batch_size)
+            async for reader in cursor:
+                yield str(reader["_id"]), self._decode_embeddings(reader)["embeddings"]
+        except Exception as e:
+            logger.error(f"Error streaming reader embeddings: {str(e)}")
+            raise
+
+    # Reader digest operations
+    @observe_mongo("reader_digests", "bulk_write")
+    async def upsert_reader_digests(self, version: int, rankings: Dict[str, List[str]]) -> int:
+        """
+        Store precomputed digest rankings, one document per (readerId, version).
+
+        Args:
+            version: Digest version the rankings were computed against
+            rankings: Digest IDs per reader ID, best first
+
+        Returns:
+            int: Number of upserted or modified documents
+        """
+        if not rankings:
+            return 0
+        try:
+            created_at = datetime.utcnow()
+            result = await self.db.reader_digests.bulk_write([
+                UpdateOne(
+                    {"readerId": reader_id, "version": version},
+                    {"$set": {"digests": digest_ids, "createdAt": created_at}},
+                    upsert=True
+                )
+                for reader_id, digest_ids in rankings.items()
+            ], ordered=False)
+            return result.upserted_count + result.modified_count
+        except Exception as e:
+            logger.error(
+                "Failed to store reader digests",
+                extra={
+                    'version': version,
+                    'total': len(rankings),
+                    'error': str(e)
+                }
+            )
+            raise
+
+    @observe_mongo("reader_digests", "find_one")
+    async def get_reader_digests(self, reader_id: str, version: int) -> Optional[List[str]]:
+        """Get the precomputed digest ranking of a reader, or None when there is none for version."""
+        document = await self.db.reader_digests.find_one(
+            {"readerId": reader_id, "version": version},
+            {"digests": 1, "_id": 0}
+        )
+        return document["digests"] if document else None
+
+    @observe_mongo("reader_digests", "delete_many")
+    async def delete_reader_digests_before(self, version: int) -> int:
+        """Delete the rankings of versions older than version."""
+        result = await self.db.reader_digests.delete_many({"version": {"$lt": version}})
+        return result.deleted_count
+
     async def get_latest_digest_version(self) -> int:
         """
-        Get the latest digest version (timestamp).
+        Get the latest digest version (timestamp) whose batch run completed.
+
+        Digests of a run in progress, or of one that stopped with failed clusters, are
+        stored before the run ends, so the version is taken from digest_runs. Versions
+        stored before runs had manifests are only used when no run has completed, and
+        never the version of a run that has a manifest but is not completed.
         
         Returns:
             int: Latest version timestamp in milliseconds since epoch
         """
         try:
+            run = await self.db.digest_runs.find_one(
+                {'status': 'completed'},
+                {'version': 1, '_id': 0},
+                sort=[('version', -1)]
+            )
+            if run is not None:
+                return run['version']
+
             pipeline = [
+                {
+                    '$match': {'version': {'$nin': await self.db.digest_runs.distinct('version')}}
+                },
                 {
                     '$sort': {'version': -1}
                 },
@@ -173,6 +421,8 @@ class MongoDBService:
             logger.error(f"Error getting digest status: {str(e)}")
             raise
 
+    @observe_mongo("digests", "insert_one")
+    @traced("insert_digest")
     async def insert_digest(self, digest: Dict[str, Any]) -> str:
         """
         Insert a digest document into MongoDB.
@@ -200,7 +450,7 @@ class MongoDBService:
                 }
             )
             
-            result = await self.db.digests.insert_one(digest)
+            result = await self.db.digests.insert_one(self._encode_embeddings(digest))
             
             logger.info(
                 "Digest inserted successfully",
@@ -225,17 +475,261 @@ class MongoDBService:
             )
             raise
 
+    @observe_mongo("digests", "insert_many")
+    @traced("insert_digests")
+    async def insert_digests(self, digests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Insert many digest documents with one unordered insert_many.
+
+        A failing document does not stop the others from being inserted.
+
+        Args:
+            digests: Digest documents, see insert_digest
+
+        Returns:
+            Dict containing:
+            - inserted_ids: List aligned with digests, the ID of each inserted digest as a
+              string, or None where the insertion failed
+            - errors: One {"index", "error"} entry per failed digest
+
+        Raises:
+            Exception: If the insertion fails for another reason than per-document errors
+        """
+        if not digests:
+            return {'inserted_ids': [], 'errors': []}
+
+        documents = [dict(self._encode_embeddings(digest)) for digest in digests]
+        for document in documents:
+            # Assign IDs up front so they are known even when the bulk write partially fails
+            document.setdefault('_id', ObjectId())
+        inserted_ids = [str(document['_id']) for document in documents]
+        errors = []
+
+        try:
+            await self.db.digests.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                inserted_ids[write_error['index']] = None
+                errors.append({'index': write_error['index'], 'error': write_error.get('errmsg')})
+        except Exception as e:
+            logger.error(
+                "Failed to insert digests",
+                extra={
+                    'total': len(digests),
+                    'error': str(e)
+                }
+            )
+            raise
+
+        for error in errors:
+            digest = digests[error['index']]
+            logger.error(
+                "Failed to insert digest",
+                extra={
+                    'error': error['error'],
+                    'title': digest.get('title'),
+                    'cluster': digest.get('cluster'),
+                    'version': digest.get('version')
+                }
+            )
+        logger.info(
+            "Digests inserted",
+            extra={
+                'total': len(digests),
+                'failed': len(errors)
+            }
+        )
+        return {'inserted_ids': inserted_ids, 'errors': errors}
+
+    @observe_mongo("digests", "copy")
+    async def copy_digests(self, from_version: int, to_version: int, clusters: List[str],
+                           cluster_map: Optional[Dict[str, str]] = None) -> int:
+        """
+        Copy the digests of the given clusters from one version into another.
+
+        Args:
+            from_version: Version to copy from
+            to_version: Version the copies are stored under
+            clusters: Cluster IDs whose digests are copied
+            cluster_map: Cluster ID the copies get, per copied cluster ID; copies keep
+                         their cluster ID when omitted
+
+        Returns:
+            int: Number of copied digests
+        """
+        if not clusters:
+            return 0
+        try:
+            cursor = self.db.digests.find({
+                'version': from_version,
+                'cluster': {'$in': clusters}
+            })
+            copies = []
+            async for digest in cursor:
+                digest.pop('_id')
+                digest['version'] = to_version
+                if cluster_map is not None:
+                    digest['cluster'] = cluster_map[digest['cluster']]
+                digest['createdAt'] = datetime.utcnow()
+                copies.append(digest)
+            if copies:
+                await self.db.digests.insert_many(copies, ordered=False)
+
+            logger.info(
+                "Digests copied",
+                extra={
+                    'from_version': from_version,
+                    'to_version': to_version,
+                    'total': len(copies)
+                }
+            )
+            return len(copies)
+        except Exception as e:
+            logger.error(
+                "Failed to copy digests",
+                extra={
+                    'from_version': from_version,
+                    'to_version': to_version,
+                    'error': str(e)
+                }
+            )
+            raise
+
+    @observe_mongo("digests", "delete_many")
+    async def delete_digests(self, version: int, clusters: List[str]) -> int:
+        """Delete the digests of the given clusters of a version."""
+        result = await self.db.digests.delete_many({'version': version, 'cluster': {'$in': clusters}})
+        return result.deleted_count
+
+    # Digest run operations
+    @observe_mongo("digest_runs", "insert_one")
+    async def create_digest_run(self, version: int, request_id: str, clusters: Dict[str, Dict[str, Any]],
+                                base_version: Optional[int] = None) -> None:
+        """
+        Store the manifest of a batch digest run.
+
+        Args:
+            version: Version the run generates
+            request_id: Request ID of the run
+            clusters: Manifest entry per cluster ID, holding at least its articleIds;
+                      clusters start as pending unless the entry sets a status
+            base_version: Version an incremental run extends
+        """
+        now = datetime.utcnow()
+        await self.db.digest_runs.insert_one({
+            'version': version,
+            'requestId': request_id,
+            'baseVersion': base_version,
+            'status': 'running',
+            'clusters': {
+                cluster: {'status': 'pending', **entry}
+                for cluster, entry in clusters.items()
+            },
+            'createdAt': now,
+            'updatedAt': now
+        })
+
+    @observe_mongo("digest_runs", "update_one")
+    async def update_digest_run_clusters(self, version: int, statuses: Dict[str, str]) -> None:
+        """Set the status ("pending", "done" or "failed") of clusters in a run manifest."""
+        if not statuses:
+            return
+        await self.db.digest_runs.update_one(
+            {'version': version},
+            {'$set': {
+                **{f'clusters.{cluster}.status': status for cluster, status in statuses.items()},
+                'updatedAt': datetime.utcnow()
+            }}
+        )
+
+    @observe_mongo("digest_runs", "update_one")
+    async def set_digest_run_status(self, version: int, status: str) -> None:
+        """Set the status of a run: "running", "completed", "incomplete" or "failed"."""
+        await self.db.digest_runs.update_one(
+            {'version': version},
+            {'$set': {'status': status, 'updatedAt': datetime.utcnow()}}
+        )
+
+    @observe_mongo("digest_runs", "update_one")
+    async def claim_digest_run(self, version: int, statuses: List[str],
+                               stale_before: Optional[datetime] = None) -> bool:
+        """
+        Set a run back to "running" if its status is one of statuses.
+
+        Args:
+            version: Version of the run
+            statuses: Statuses the run may be claimed from
+            stale_before: Also claim a "running" run whose manifest was last updated
+                          before this time, as its process has died
+
+        Returns:
+            bool: Whether the run was claimed; False when another caller changed it first
+        """
+        claimable: List[Dict[str, Any]] = [{'status': {'$in': statuses}}]
+        if stale_before is not None:
+            claimable.append({'status': 'running', 'updatedAt': {'$lt': stale_before}})
+        result = await self.db.digest_runs.update_one(
+            {'version': version, '$or': claimable},
+            {'$set': {'status': 'running', 'updatedAt': datetime.utcnow()}}
+        )
+        return result.modified_count == 1
+
+    @observe_mongo("digest_runs", "find_one")
+    async def get_digest_run(self, version: int) -> Optional[Dict[str, Any]]:
+        """Get the manifest of a run, or None when the version has none."""
+        return await self.db.digest_runs.find_one({'version': version}, {'_id': 0})
+
+    @observe_mongo("digest_runs", "find_one")
+    async def get_previous_digest_run(self, version: int) -> Optional[Dict[str, Any]]:
+        """Get the manifest of the latest finished run before version, or None."""
+        return await self.db.digest_runs.find_one(
+            {'version': {'$lt': version}, 'status': {'$in': ['completed', 'incomplete']}},
+            {'_id': 0},
+            sort=[('version', -1)]
+        )
+
+    @observe_mongo("digest_timings", "insert_one")
+    async def save_digest_timing(self, version: int, request_id: str, status: str,
+                                 report: Dict[str, Any]) -> None:
+        """
+        Store the timing report of a batch digest run.
+
+        Args:
+            version: Version the run generated
+            request_id: Request ID of the run
+            status: Final status of the run
+            report: Trace summary, see Trace.report
+        """
+        await self.db.digest_timings.insert_one({
+            'version': version,
+            'requestId': request_id,
+            'status': status,
+            'report': report,
+            'createdAt': datetime.utcnow()
+        })
+
+    @observe_mongo("digest_timings", "find_one")
+    async def get_digest_timing(self, version: int) -> Optional[Dict[str, Any]]:
+        """Get the latest timing report of a version (a resumed run stores its own), or None."""
+        return await self.db.digest_timings.find_one(
+            {'version': version},
+            {'_id': 0},
+            sort=[('createdAt', -1)]
+        )
+
     # Article operations
+    @observe_mongo("articles", "insert_one")
     async def insert_article(self, article_data):
         """Insert a new article"""
         try:
-            result = await self.db.articles.insert_one(article_data)
+            result = await self.db.articles.insert_one(self._encode_embeddings(article_data))
             logger.info(f"Article inserted with ID: {result.inserted_id}")
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Failed to insert article: {str(e)}")
             raise
 
+    @observe_mongo("articles", "find_one")
     async def get_article(self, article_id: str) -> Optional[Dict]:
         """Retrieve an article by ID"""
         try:
@@ -245,6 +739,7 @@ class MongoDBService:
             logger.error(f"Failed to retrieve article {article_id}: {str(e)}")
             raise
 
+    @observe_mongo("articles", "find")
     async def get_articles_by_topic(self, topic: str, limit: int = 10) -> List[Dict]:
         """Retrieve articles by topic"""
         try:
@@ -255,16 +750,18 @@ class MongoDBService:
             raise
 
     # Reader operations
+    @observe_mongo("users", "insert_one")
     async def insert_reader(self, reader_data):
         """Insert a new reader"""
         try:
-            result = await self.db.readers.insert_one(reader_data)
+            result = await self.db.readers.insert_one(self._encode_embeddings(reader_data))
             logger.info(f"Reader inserted with ID: {result.inserted_id}")
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Failed to insert reader: {str(e)}")
             raise
 
+    @observe_mongo("users", "update_one")
     async def update_reader_interests(self, reader_id: str, interests: List[str]) -> bool:
         """Update reader interests"""
         try:
@@ -280,8 +777,58 @@ class MongoDBService:
             logger.error(f"Failed to update reader {reader_id} interests: {str(e)}")
             raise
 
-    # Cleanup
-    def close(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close() 
\ No newline at end of file
+    async def migrate_embeddings(self, collection: str = "digests", batch_size: int = 500) -> int:
+        """
+        Rewrite embeddings stored as BSON arrays into packed float32 binary.
+
+        Documents already in binary format are skipped, so the migration can be
+        re-run safely. The articles and users collections are also read by the
+        backend service, which expects arrays; only migrate them once it reads binary.
+
+        Args:
+            collection: Name of the collection to migrate
+            batch_size: Number of documents updated per bulk write
+
+        Returns:
+            int: Number of migrated documents
+        """
+        migrated = 0
+        try:
+            cursor = self.db[collection].find(
+                {"embeddings": {"$type": "array"}},
+                {"embeddings": 1}
+            ).batch_size(batch_size)
+
+            operations = []
+            async for doc in cursor:
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"embeddings": encode_float32_vector(doc["embeddings"])}}
+                ))
+                if len(operations) >= batch_size:
+                    migrated += (await self.db[collection].bulk_write(operations, ordered=False)).modified_count
+                    operations = []
+            if operations:
+                migrated += (await self.db[collection].bulk_write(operations, ordered=False)).modified_count
+
+            logger.info(
+                "Embeddings migrated to binary",
+                extra={
+                    'collection': collection,
+                    'migrated': migrated
+                }
+            )
+            return migrated
+        except Exception as e:
+            logger.error(
+                "Embeddings migration failed",
+                extra={
+                    'collection': collection,
+                    'migrated': migrated,
+                    'error': str(e)
+                }
+            )
+            raise
+
+# Shared by every MongoDBService in the process
+mongo_connection = MongoConnection()
\ No newline at end of file
@@ -0,0 +1,210 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import os
+import random
+import time
+import openai
+from ..utils.logger import logger
+from ..utils.tracing import increment
+
+T = TypeVar("T")
+
+# Azure OpenAI quotas per deployment type, for the whole deployment; 0 disables the
+# corresponding limit. Buckets are per process, so each of the RATE_LIMIT_WORKERS
+# processes sharing the quota (gunicorn workers, defaults to WEB_CONCURRENCY) gets
+# an equal share. Concurrency caps are per process.
+RATE_LIMIT_WORKERS = max(1, int(os.getenv("RATE_LIMIT_WORKERS", os.getenv("WEB_CONCURRENCY", "1"))))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "0"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "0"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+
+# Completion tokens reserved per LLM call when the prompt config sets no max_tokens;
+# Azure counts them against the TPM quota along with the prompt
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1000"))
+
+# Retries of throttled and transient failures, with jittered exponential backoff
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "6"))
+RATE_LIMIT_BASE_DELAY_SECONDS = float(os.getenv("RATE_LIMIT_BASE_DELAY_SECONDS", "1"))
+RATE_LIMIT_MAX_DELAY_SECONDS = float(os.getenv("RATE_LIMIT_MAX_DELAY_SECONDS", "60"))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+def estimate_tokens(text: Any, completion_tokens: int = 0) -> int:
+    """
+    Rough token count of a request: the prompt at about four characters per token,
+    plus the completion tokens it may generate.
+    """
+    return len(str(text)) // 4 + 1 + completion_tokens
+
+def share_per_worker(per_minute: int) -> int:
+    """This process's share of a deployment-wide per-minute quota (0 stays disabled)."""
+    return max(1, per_minute // RATE_LIMIT_WORKERS) if per_minute > 0 else 0
+
+class TokenBucket:
+    """Refills rate_per_minute units per minute, holding at most one minute's worth."""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> float:
+        """
+        Take amount units, waiting for the bucket to refill if needed.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        # A single call larger than the bucket would wait forever; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+class RateLimiter:
+    """
+    Schedules calls to one Azure OpenAI deployment type within its quotas.
+
+    Each call waits for a concurrency slot, one request from the RPM bucket and its
+    estimated tokens from the TPM bucket. Throttled (429) and transient failures are
+    retried with jittered exponential backoff; a Retry-After from the API pauses every
+    caller of the limiter, since the quota is shared.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 0, max_retries: int = RATE_LIMIT_MAX_RETRIES,
+                 base_delay: float = RATE_LIMIT_BASE_DELAY_SECONDS,
+                 max_delay: float = RATE_LIMIT_MAX_DELAY_SECONDS):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._paused_until = 0.0
+        self._counters = {
+            'calls': 0,
+            'throttled': 0,
+            'retried': 0,
+            'failed': 0,
+            'queued_seconds': 0.0
+        }
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 1) -> T:
+        """
+        Run call within the limits, retrying throttled and transient failures.
+
+        Args:
+            call: Zero-argument coroutine function issuing one API request
+            estimated_tokens: Tokens the request is expected to consume
+
+        Raises:
+            The last error once retries are exhausted, or any non-retryable error
+        """
+        self._counters['calls'] += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._get_semaphore():
+                    await self._wait_for_capacity(estimated_tokens)
+                    return await call()
+            except RETRYABLE_ERRORS as e:
+                throttled = isinstance(e, openai.RateLimitError)
+                if throttled:
+                    self._counters['throttled'] += 1
+                    increment(f"{self.name}_throttled")
+                if attempt == self.max_retries:
+                    self._counters['failed'] += 1
+                    raise
+
+                retry_after = self._retry_after(e)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if throttled and retry_after is not None:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self._counters['retried'] += 1
+                increment(f"{self.name}_retries")
+                logger.warning(
+                    "Retrying API call",
+                    extra={
+                        'limiter': self.name,
+                        'attempt': attempt + 1,
+                        'delay_seconds': round(delay, 2),
+                        'error': str(e)
+                    }
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                self._counters['failed'] += 1
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, 'queued_seconds': round(self._counters['queued_seconds'], 3)}
+
+    async def _wait_for_capacity(self, estimated_tokens: int) -> None:
+        started = time.monotonic()
+        pause = self._paused_until - started
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if self._requests is not None:
+            await self._requests.acquire(1)
+        if self._tokens is not None:
+            await self._tokens.acquire(estimated_tokens)
+        self._counters['queued_seconds'] += time.monotonic() - started
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            if 'retry-after-ms' in response.headers:
+                return min(float(response.headers['retry-after-ms']) / 1000, self.max_delay)
+            if 'retry-after' in response.headers:
+                return min(float(response.headers['retry-after']), self.max_delay)
+        except ValueError:
+            # HTTP-date Retry-After values are not used by Azure OpenAI
+            return None
+        return None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the limiter can be built at import time, outside an event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency if self._max_concurrency > 0 else 2**31)
+        return self._semaphore
+
+# Shared by every BaseService in the process
+llm_rate_limiter = RateLimiter(
+    "llm",
+    requests_per_minute=share_per_worker(LLM_REQUESTS_PER_MINUTE),
+    tokens_per_minute=share_per_worker(LLM_TOKENS_PER_MINUTE),
+    max_concurrency=LLM_MAX_CONCURRENCY
+)
+embedding_rate_limiter = RateLimiter(
+    "embeddings",
+    requests_per_minute=share_per_worker(EMBEDDING_REQUESTS_PER_MINUTE),
+    tokens_per_minute=share_per_worker(EMBEDDING_TOKENS_PER_MINUTE),
+    max_concurrency=EMBEDDING_MAX_CONCURRENCY
+)
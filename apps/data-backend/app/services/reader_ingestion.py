@@ -30,13 +30,12 @@ class ReaderIngestionService(BaseService):
         fuseprompt = self.fuse_prompt_facade.get_prompt(PromptName.READER_PROFILER)
         llm = self._get_llm(fuseprompt)
         instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt, reader=reader_data)
-        reader_profile = await llm.ainvoke(instructions)
+        reader_profile = await self._invoke_llm(fuseprompt, llm, instructions)
 
         # Process Embeddings
         fuseprompt_embeddings = self.fuse_prompt_facade.get_prompt(PromptName.READER_EMBEDDINGS)
-        embedder = self._get_embedder(fuseprompt_embeddings)
         embeddings_instructions = self.fuse_prompt_facade.compile_prompt(fuseprompt_embeddings, **reader_profile)
-        embeddings = await embedder.aembed_query(embeddings_instructions)
+        embeddings = (await self._embed_documents(fuseprompt_embeddings, [embeddings_instructions]))[0]
 
         reader_profile["embeddings"] = embeddings
 
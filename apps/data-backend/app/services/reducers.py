@@ -0,0 +1,103 @@
+from typing import Dict, Optional, Type
+import numpy as np
+
+class Reducer:
+    """
+    Dimensionality reduction applied to embeddings before clustering.
+
+    Reducers are fitted once per full clustering run and pickled with the cluster
+    state, so transform must place new embeddings in the same space.
+    """
+
+    name = "none"
+    default_dimensions: Optional[int] = None
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self.dimensions = dimensions or self.default_dimensions
+
+    @property
+    def spec(self) -> str:
+        """Name and target dimensions in the "name:dimensions" form accepted by get_reducer."""
+        return f"{self.name}:{self.dimensions}" if self.dimensions else self.name
+
+    def fit_transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return embeddings
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return embeddings
+
+class UMAPReducer(Reducer):
+    """UMAP manifold embedding; seeded, so it runs single-threaded."""
+
+    name = "umap"
+    default_dimensions = 2
+
+    def fit_transform(self, embeddings: np.ndarray) -> np.ndarray:
+        import umap
+        self._model = umap.UMAP(n_components=self.dimensions, random_state=42)
+        return self._model.fit_transform(embeddings)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return self._model.transform(embeddings)
+
+class PCAReducer(Reducer):
+    """Randomized PCA."""
+
+    name = "pca"
+    default_dimensions = 50
+
+    def fit_transform(self, embeddings: np.ndarray) -> np.ndarray:
+        from sklearn.decomposition import PCA
+        self._model = PCA(n_components=self.dimensions, svd_solver="randomized", random_state=42)
+        return self._model.fit_transform(embeddings)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return self._model.transform(embeddings)
+
+class RandomProjectionReducer(Reducer):
+    """Gaussian random projection; data independent, so fitting only draws the matrix."""
+
+    name = "random_projection"
+    default_dimensions = 256
+
+    def fit_transform(self, embeddings: np.ndarray) -> np.ndarray:
+        from sklearn.random_projection import GaussianRandomProjection
+        self._model = GaussianRandomProjection(n_components=self.dimensions, random_state=42)
+        return self._model.fit_transform(embeddings)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return self._model.transform(embeddings)
+
+class TruncationReducer(Reducer):
+    """
+    Matryoshka-style truncation: keep the leading dimensions and re-normalize.
+    Valid for embedding models trained for shortening, such as text-embedding-3.
+    """
+
+    name = "truncate"
+    default_dimensions = 256
+
+    def fit_transform(self, embeddings: np.ndarray) -> np.ndarray:
+        return self.transform(embeddings)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        truncated = np.ascontiguousarray(embeddings[:, :self.dimensions])
+        norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+        return truncated / np.maximum(norms, np.finfo(truncated.dtype).eps)
+
+REDUCERS: Dict[str, Type[Reducer]] = {
+    reducer.name: reducer
+    for reducer in (Reducer, UMAPReducer, PCAReducer, RandomProjectionReducer, TruncationReducer)
+}
+
+def get_reducer(spec: str) -> Reducer:
+    """
+    Build a reducer from a "name" or "name:dimensions" spec, e.g. "umap", "pca:64".
+
+    Raises:
+        ValueError: If the reducer name is unknown
+    """
+    name, _, dimensions = spec.partition(":")
+    if name not in REDUCERS:
+        raise ValueError(f"Unknown reducer: {name}. Expected one of {sorted(REDUCERS)}")
+    return REDUCERS[name](int(dimensions) if dimensions else None)
@@ -0,0 +1,31 @@
+from typing import Any, Sequence, Union
+import numpy as np
+from bson.binary import Binary
+
+# BSON binary subtype 9 (vector) with the packed float32 dtype header
+VECTOR_SUBTYPE = 9
+FLOAT32_DTYPE = 0x27
+FLOAT32_HEADER = bytes([FLOAT32_DTYPE, 0])
+
+def encode_float32_vector(vector: Union[Sequence[float], np.ndarray]) -> Binary:
+    """Pack a vector as little-endian float32 BSON binary, compatible with the vector subtype."""
+    return Binary(FLOAT32_HEADER + np.asarray(vector, dtype="<f4").tobytes(), VECTOR_SUBTYPE)
+
+def is_float32_vector(value: Any) -> bool:
+    """Check whether a BSON value is a packed float32 vector."""
+    return (
+        isinstance(value, Binary)
+        and value.subtype == VECTOR_SUBTYPE
+        and value[:2] == FLOAT32_HEADER
+    )
+
+def decode_vector(value: Any) -> np.ndarray:
+    """
+    Decode a stored embedding into a float32 NumPy array.
+
+    Packed float32 binaries are viewed in place with np.frombuffer (read-only, no copy);
+    legacy BSON arrays of doubles are converted.
+    """
+    if is_float32_vector(value):
+        return np.frombuffer(value, dtype="<f4", offset=len(FLOAT32_HEADER))
+    return np.asarray(value, dtype=np.float32)
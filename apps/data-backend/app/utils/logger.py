@@ -1,9 +1,14 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-import uuid
 import os
-from datetime import datetime
-from typing import Any, Dict
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from pythonjsonlogger import jsonlogger
 import structlog
 from coralogix.handlers import CoralogixLogger
@@ -14,28 +19,63 @@ CORALOGIX_API_KEY = os.getenv('CORALOGIX_API_KEY')
 SUBSYSTEM_NAME = "bacafe-data-backend"
 APPLICATION_NAME = os.getenv('LOG_ENV', 'production')
 
+# Share of INFO records kept, and the most INFO records per message per second (0 = no limit).
+# Warnings and errors are never dropped.
+LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+LOG_INFO_MAX_PER_SECOND = int(os.getenv('LOG_INFO_MAX_PER_SECOND', '0'))
+
+# Request ID of the current request, set by the HTTP middleware and inherited by its background tasks
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record: Dict[str, Any], record: logging.LogRecord, message_dict: Dict[str, Any]) -> None:
         super(CustomJsonFormatter, self).add_fields(log_record, record, message_dict)
-        
+
         # Add custom fields
-        log_record['timestamp'] = datetime.utcnow().isoformat()
+        log_record['timestamp'] = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
         log_record['level'] = record.levelname
         log_record['logger'] = record.name
-        
-        if not log_record.get('request_id'):
-            log_record['request_id'] = str(uuid.uuid4())
 
-def setup_logger(name: str = "app") -> logging.Logger:
-    """Setup logger with different formatters based on environment"""
-    logger = logging.getLogger(name)
-    
-    # Clear any existing handlers
-    logger.handlers = []
-    
+class RequestContextFilter(logging.Filter):
+    """Set record.request_id from request_id_var unless the call passed one in extra."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+class InfoSamplingFilter(logging.Filter):
+    """Drop part of the INFO records: a random sample, then at most max_per_second per message."""
+
+    def __init__(self, sample_rate: float = LOG_INFO_SAMPLE_RATE, max_per_second: int = LOG_INFO_MAX_PER_SECOND):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._window = 0
+        self._counts: Dict[Any, int] = {}
+        # Records also come from worker threads (asyncio.to_thread, prompt refresh)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.INFO:
+            return True
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.max_per_second > 0:
+            window = int(record.created)
+            with self._lock:
+                if window != self._window:
+                    self._window, self._counts = window, {}
+                count = self._counts.get(record.msg, 0) + 1
+                self._counts[record.msg] = count
+            return count <= self.max_per_second
+        return True
+
+def build_handlers() -> List[logging.Handler]:
+    """Create the handlers that format and ship records, based on environment."""
     # Add stdout handler
     stdout_handler = logging.StreamHandler(sys.stdout)
-    
+
     if LOG_ENV == 'development':
         # Development: Simple console formatter with colors
         formatter = logging.Formatter(
@@ -48,9 +88,9 @@ def setup_logger(name: str = "app") -> logging.Logger:
             '%(timestamp)s %(level)s %(name)s %(request_id)s %(message)s'
         )
         stdout_handler.setFormatter(formatter)
-    
-    logger.addHandler(stdout_handler)
-    
+
+    handlers: List[logging.Handler] = [stdout_handler]
+
     # Add Coralogix handler if API key is available
     if CORALOGIX_API_KEY:
         coralogix_handler = CoralogixLogger(
@@ -58,17 +98,83 @@ def setup_logger(name: str = "app") -> logging.Logger:
             app_name=APPLICATION_NAME,
             subsystem=SUBSYSTEM_NAME
         )
-        
+
         # Use JSON formatter for Coralogix
         coralogix_formatter = CustomJsonFormatter(
             '%(timestamp)s %(level)s %(name)s %(request_id)s %(message)s'
         )
         coralogix_handler.setFormatter(coralogix_formatter)
-        logger.addHandler(coralogix_handler)
-    
+        handlers.append(coralogix_handler)
+
+    return handlers
+
+class LeanQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that enqueues plain records as they are instead of copying them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only records with %-args or exception info need rendering before they cross threads
+        if record.args or record.exc_info:
+            return super().prepare(record)
+        return record
+
+class QueuedLogging:
+    """
+    Moves formatting and shipping of log records to a QueueListener thread.
+
+    The logger only gets a QueueHandler, so the calling thread (usually the event loop)
+    just filters the record and enqueues it.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], sample_rate: float = LOG_INFO_SAMPLE_RATE,
+                 max_per_second: int = LOG_INFO_MAX_PER_SECOND):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handler = LeanQueueHandler(self.queue)
+        self.handler.addFilter(InfoSamplingFilter(sample_rate, max_per_second))
+        self.handler.addFilter(RequestContextFilter())
+        self.handlers = handlers
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        # Process the listener was started in; a forked worker inherits it without its thread
+        self._started_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the listener thread, unless it is already running in this process."""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            if self._started_pid is not None:
+                # Forked while the parent's listener was blocked on the queue, whose lock the
+                # child inherits held; records go to a fresh queue instead
+                self.queue = queue.SimpleQueue()
+                self.handler.queue = self.queue
+            self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self._started_pid = os.getpid()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread."""
+        with self._lock:
+            if self._started_pid != os.getpid():
+                return
+            self.listener.stop()
+            self._started_pid = None
+
+def setup_logger(name: str = "app") -> logging.Logger:
+    """Setup logger with different formatters based on environment"""
+    logger = logging.getLogger(name)
+
+    # Clear any existing handlers
+    logger.handlers = []
+    logger.addHandler(queued_logging.handler)
     logger.setLevel(logging.INFO)
     return logger
 
+def start_logging() -> None:
+    queued_logging.start()
+
+def stop_logging() -> None:
+    queued_logging.stop()
+
 # Configure structlog based on environment
 processors = [
     structlog.contextvars.merge_contextvars,
@@ -92,5 +198,11 @@ structlog.configure(
     cache_logger_on_first_use=True,
 )
 
+# Records are handled off the calling thread; the listener runs from import so scripts
+# log too, and the app restarts/stops it in its lifespan
+queued_logging = QueuedLogging(build_handlers())
+queued_logging.start()
+atexit.register(queued_logging.stop)
+
 # Create main application logger
-logger = setup_logger() 
\ No newline at end of file
+logger = setup_logger()
@@ -0,0 +1,113 @@
+from typing import Any, Dict, Tuple
+import functools
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# Latency buckets (seconds) for calls that range from milliseconds to minutes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 1800)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "bacafe_http_request_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "bacafe_llm_request_seconds", "LLM call latency by prompt, retries included",
+    ["prompt"], buckets=LATENCY_BUCKETS
+)
+LLM_ERRORS = Counter("bacafe_llm_errors_total", "Failed LLM calls by prompt", ["prompt"])
+LLM_TOKENS = Counter("bacafe_llm_tokens_total", "LLM token usage by prompt and type", ["prompt", "type"])
+EMBEDDING_REQUEST_SECONDS = Histogram(
+    "bacafe_embedding_request_seconds", "Embeddings API call latency by prompt, retries included",
+    ["prompt"], buckets=LATENCY_BUCKETS
+)
+EMBEDDING_TEXTS = Counter(
+    "bacafe_embedding_texts_total", "Embedded texts by prompt and source (cache or api)",
+    ["prompt", "source"]
+)
+MONGO_OPERATION_SECONDS = Histogram(
+    "bacafe_mongo_operation_seconds", "MongoDB operation latency",
+    ["collection", "operation"], buckets=LATENCY_BUCKETS
+)
+MONGO_ERRORS = Counter("bacafe_mongo_errors_total", "Failed MongoDB operations", ["collection", "operation"])
+CLUSTERING_STAGE_SECONDS = Histogram(
+    "bacafe_clustering_stage_seconds", "Clustering stage durations",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+BATCH_RUNS_IN_PROGRESS = Gauge(
+    "bacafe_batch_runs_in_progress", "Batch digest runs in progress by mode",
+    ["mode"], multiprocess_mode="livesum"
+)
+CLUSTER_JOBS_IN_PROGRESS = Gauge(
+    "bacafe_cluster_jobs_in_progress", "Cluster digest jobs in progress",
+    multiprocess_mode="livesum"
+)
+
+# Stage timings reported by ClusteringService.last_run
+CLUSTERING_STAGES = {
+    'reduce_seconds': 'reduce',
+    'hdbscan_seconds': 'hdbscan',
+    'outliers_seconds': 'outliers'
+}
+
+def observe_clustering(last_run: Dict[str, Any]) -> None:
+    """Record the stage timings of a clustering run."""
+    for key, stage in CLUSTERING_STAGES.items():
+        if last_run.get(key) is not None:
+            CLUSTERING_STAGE_SECONDS.labels(stage).observe(last_run[key])
+
+def observe_token_usage(prompt: str, usage: Dict[str, Any]) -> None:
+    """Record the usage_metadata of an LLM response."""
+    for usage_type in ('input_tokens', 'output_tokens'):
+        if usage.get(usage_type):
+            LLM_TOKENS.labels(prompt, usage_type.split('_')[0]).inc(usage[usage_type])
+
+def observe_mongo(collection: str, operation: str):
+    """Decorate an async MongoDBService method to record its latency and failures."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                MONGO_ERRORS.labels(collection, operation).inc()
+                raise
+            finally:
+                MONGO_OPERATION_SECONDS.labels(collection, operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def track_in_progress(gauge: Gauge):
+    """Decorate an async function to count its running calls in gauge."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            gauge.inc()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                gauge.dec()
+        return wrapper
+    return decorator
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render every metric in the Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set (one process per gunicorn worker), metrics of
+    all workers are aggregated from that directory.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,249 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import functools
+import heapq
+import os
+import time
+
+# Clusters listed as slowest in a timing report, and the most critical path entries kept;
+# reports are stored as one MongoDB document, so nothing in them grows with the run
+TRACE_SLOWEST_CLUSTERS = int(os.getenv("TRACE_SLOWEST_CLUSTERS", "10"))
+TRACE_CRITICAL_PATH_LIMIT = int(os.getenv("TRACE_CRITICAL_PATH_LIMIT", "100"))
+
+class Span:
+    """A timed operation of a trace, with attributes and counters (e.g. retries)."""
+
+    __slots__ = ('id', 'name', 'parent', 'attributes', 'counters', 'started', 'ended')
+
+    def __init__(self, id: int, name: str, parent: Optional["Span"], attributes: Dict[str, Any],
+                 started: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter() if started is None else started
+        self.ended: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (time.perf_counter() if self.ended is None else self.ended) - self.started
+
+class Trace:
+    """
+    Spans of one batch digest run.
+
+    The trace is made current with start_trace; span() and traced() then record
+    spans under the current span, including in tasks and threads started from it,
+    since they inherit the context. Outside a trace they record nothing.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.spans: List[Span] = []
+        self.root = self._open(name, None, attributes)
+        self._tokens = None
+
+    def close(self) -> None:
+        """End the root span and restore the trace that was current before, once."""
+        if self.root.ended is None:
+            self.root.ended = time.perf_counter()
+        if self._tokens is not None:
+            trace_token, span_token = self._tokens
+            current_span.reset(span_token)
+            current_trace.reset(trace_token)
+            self._tokens = None
+
+    def report(self, slowest: int = TRACE_SLOWEST_CLUSTERS,
+               critical_path_limit: int = TRACE_CRITICAL_PATH_LIMIT) -> Dict[str, Any]:
+        """
+        Summarize the trace, in a size that does not grow with the number of clusters.
+
+        Returns:
+            Dict with the total duration, the duration of each top-level stage, the
+            first critical_path_limit entries of the critical path (and how many were
+            left out), totals over the clusters (one per process_cluster_job span), the
+            slowest clusters, counters summed over the trace (retries, throttled calls)
+            and the count, total and maximum duration of spans per name
+        """
+        children: Dict[int, List[Span]] = {}
+        for span in self.spans[1:]:
+            children.setdefault(span.parent.id, []).append(span)
+
+        stages: Dict[str, float] = {}
+        for span in children.get(self.root.id, []):
+            stages[span.name] = stages.get(span.name, 0.0) + span.seconds
+
+        clusters = [
+            self._cluster_entry(span, children)
+            for span in self.spans
+            if span.name == 'process_cluster_job'
+        ]
+
+        by_name: Dict[str, Dict[str, Any]] = {}
+        counters: Dict[str, int] = {}
+        for span in self.spans:
+            summary = by_name.setdefault(span.name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            summary['count'] += 1
+            summary['total_seconds'] += span.seconds
+            summary['max_seconds'] = max(summary['max_seconds'], span.seconds)
+            for key, value in span.counters.items():
+                counters[key] = counters.get(key, 0) + value
+
+        critical_path = self._critical_path(self.root, children)
+        return {
+            'name': self.root.name,
+            **self.root.attributes,
+            'total_seconds': round(self.root.seconds, 3),
+            'stages': {name: round(seconds, 3) for name, seconds in stages.items()},
+            'critical_path': critical_path[:critical_path_limit],
+            'critical_path_truncated': max(0, len(critical_path) - critical_path_limit),
+            'clusters': {
+                'count': len(clusters),
+                **{
+                    key: round(sum(entry[key] for entry in clusters), 3)
+                    for key in ('seconds', 'llm_seconds', 'embeddings_seconds')
+                },
+                'max_seconds': max((entry['seconds'] for entry in clusters), default=0.0),
+                'retries': sum(entry['retries'] for entry in clusters)
+            },
+            'slowest_clusters': heapq.nlargest(slowest, clusters, key=lambda entry: entry['seconds']),
+            'counters': counters,
+            'spans': {
+                name: {
+                    'count': summary['count'],
+                    'total_seconds': round(summary['total_seconds'], 3),
+                    'max_seconds': round(summary['max_seconds'], 3)
+                }
+                for name, summary in by_name.items()
+            }
+        }
+
+    def _open(self, name: str, parent: Optional[Span], attributes: Dict[str, Any],
+              started: Optional[float] = None) -> Span:
+        span = Span(len(self.spans), name, parent, attributes, started)
+        # list.append is atomic, so spans may be opened from worker threads too
+        self.spans.append(span)
+        return span
+
+    def _critical_path(self, span: Span, children: Dict[int, List[Span]], depth: int = 0) -> List[Dict[str, Any]]:
+        """
+        Spans that kept span from ending earlier, in order: walking back from its end,
+        the child that ended last, then the child that ended last before that one
+        started, and so on, each expanded the same way.
+        """
+        chain: List[Span] = []
+        horizon = span.ended if span.ended is not None else time.perf_counter()
+        for child in sorted(children.get(span.id, []), key=self._ended, reverse=True):
+            if self._ended(child) <= horizon:
+                chain.append(child)
+                horizon = child.started
+        path = []
+        for child in reversed(chain):
+            path.append({
+                'name': child.name,
+                'depth': depth,
+                'offset_seconds': round(child.started - self.root.started, 3),
+                'seconds': round(child.seconds, 3),
+                **({'attributes': child.attributes} if child.attributes else {})
+            })
+            path.extend(self._critical_path(child, children, depth + 1))
+        return path
+
+    def _cluster_entry(self, span: Span, children: Dict[int, List[Span]]) -> Dict[str, Any]:
+        seconds: Dict[str, float] = {}
+        counters: Dict[str, int] = {}
+        stack = list(children.get(span.id, []))
+        while stack:
+            child = stack.pop()
+            seconds[child.name] = seconds.get(child.name, 0.0) + child.seconds
+            for key, value in child.counters.items():
+                counters[key] = counters.get(key, 0) + value
+            stack.extend(children.get(child.id, []))
+        return {
+            **span.attributes,
+            'seconds': round(span.seconds, 3),
+            'llm_seconds': round(seconds.get('llm', 0.0), 3),
+            'embeddings_seconds': round(seconds.get('embeddings', 0.0), 3),
+            'retries': sum(value for key, value in counters.items() if key.endswith('_retries'))
+        }
+
+    @staticmethod
+    def _ended(span: Span) -> float:
+        return span.ended if span.ended is not None else time.perf_counter()
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+def start_trace(name: str, **attributes: Any) -> Trace:
+    """Start a trace and make it current until Trace.close."""
+    trace = Trace(name, **attributes)
+    trace._tokens = (current_trace.set(trace), current_span.set(trace.root))
+    return trace
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Record the enclosed block as a child of the current span, if a trace is current."""
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    opened = trace._open(name, current_span.get(), attributes)
+    token = current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        opened.ended = time.perf_counter()
+        current_span.reset(token)
+
+@contextmanager
+def activate(parent: Optional[Span]) -> Iterator[None]:
+    """Record spans of the enclosed block under parent instead of the current span."""
+    if parent is None:
+        yield
+        return
+    token = current_span.set(parent)
+    try:
+        yield
+    finally:
+        current_span.reset(token)
+
+def traced(name: str):
+    """Decorate an async function to record each call as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span."""
+    opened = current_span.get()
+    if opened is not None and current_trace.get() is not None:
+        opened.attributes.update(attributes)
+
+def increment(counter: str, amount: int = 1) -> None:
+    """Add amount to a counter of the current span."""
+    opened = current_span.get()
+    if opened is not None and current_trace.get() is not None:
+        opened.counters[counter] = opened.counters.get(counter, 0) + amount
+
+def record_stages(stages: Dict[str, float]) -> None:
+    """
+    Record work timed elsewhere (e.g. in a worker process) as consecutive child
+    spans of the current span, ending now.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return
+    ended = time.perf_counter()
+    started = ended - sum(stages.values())
+    for name, seconds in stages.items():
+        stage = trace._open(name, current_span.get(), {}, started)
+        stage.ended = started + seconds
+        started = stage.ended
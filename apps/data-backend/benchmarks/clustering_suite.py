@@ -0,0 +1,130 @@
+"""
+Clustering benchmark suite on synthetic clustered embedding corpora.
+
+Every corpus size runs in its own subprocess so peak RSS is measured per size.
+Each run times the clustering stages (reduction, HDBSCAN, outlier fixing), records
+peak RSS and scores cluster recovery against the known ground truth. Results are
+written as JSON so runs from different commits can be compared.
+
+Usage:
+    python -m benchmarks.clustering_suite --sizes 1000 10000 --output results.json
+    python -m benchmarks.clustering_suite --sizes 1000 10000 --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+from app.services.clustering import CLUSTERING_REDUCER, ClusteringService
+from .synthetic import EMBEDDING_DIMENSIONS, make_corpus
+
+DEFAULT_SIZES = [1000, 10000, 50000, 100000]
+TIMING_KEYS = ["corpus_seconds", "reduce_seconds", "hdbscan_seconds", "outliers_seconds", "total_seconds"]
+
+def run_size(articles: int, dimensions: int, reducer: str, articles_per_cluster: int) -> dict:
+    """Benchmark a single corpus size in the current process."""
+    start = time.perf_counter()
+    embeddings, truth = make_corpus(articles, max(articles // articles_per_cluster, 2), dimensions)
+    corpus_seconds = time.perf_counter() - start
+
+    service = ClusteringService()
+    start = time.perf_counter()
+    labels, _ = service.fit_matrix(embeddings, list(range(articles)), reducer=reducer)
+    total_seconds = time.perf_counter() - start
+
+    return {
+        "articles": articles,
+        "dimensions": dimensions,
+        "reducer": service.last_run["reducer"],
+        "total_clusters": service.last_run["total_clusters"],
+        "true_clusters": int(truth.max()) + 1,
+        "corpus_seconds": round(corpus_seconds, 3),
+        "reduce_seconds": service.last_run["reduce_seconds"],
+        "hdbscan_seconds": service.last_run["hdbscan_seconds"],
+        "outliers_seconds": service.last_run["outliers_seconds"],
+        "total_seconds": round(total_seconds, 3),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "ari": round(float(adjusted_rand_score(truth, labels)), 4),
+        "nmi": round(float(normalized_mutual_info_score(truth, labels)), 4)
+    }
+
+def run_in_subprocess(articles: int, args: argparse.Namespace) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.clustering_suite", "--worker",
+        "--sizes", str(articles),
+        "--dimensions", str(args.dimensions),
+        "--reducer", args.reducer,
+        "--articles-per-cluster", str(args.articles_per_cluster)
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"articles": articles, "error": completed.stderr.strip().splitlines()[-1:]}
+    # Logs go to stdout too; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_commit() -> str:
+    completed = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+    return completed.stdout.strip() or "unknown"
+
+def compare(results: list, baseline_path: str) -> None:
+    """Print the ratio of every timing and peak RSS to the baseline run of the same size."""
+    with open(baseline_path) as baseline_file:
+        baseline = {run["articles"]: run for run in json.load(baseline_file)["runs"]}
+    for run in results:
+        previous = baseline.get(run["articles"])
+        if previous is None or "error" in run or "error" in previous:
+            continue
+        ratios = {
+            key: round(run[key] / previous[key], 2)
+            for key in TIMING_KEYS + ["peak_rss_mb"]
+            if previous.get(key)
+        }
+        print(json.dumps({
+            "articles": run["articles"],
+            "ratio_to_baseline": ratios,
+            "ari_delta": round(run["ari"] - previous["ari"], 4)
+        }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS)
+    parser.add_argument("--reducer", default=CLUSTERING_REDUCER)
+    parser.add_argument("--articles-per-cluster", type=int, default=20)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_size(args.sizes[0], args.dimensions, args.reducer, args.articles_per_cluster)))
+        return
+
+    runs = []
+    for articles in args.sizes:
+        run = run_in_subprocess(articles, args)
+        print(json.dumps(run))
+        runs.append(run)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "reducer": args.reducer,
+        "dimensions": args.dimensions,
+        "runs": runs
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        compare(runs, args.compare)
+
+if __name__ == "__main__":
+    main()
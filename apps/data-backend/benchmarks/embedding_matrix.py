@@ -0,0 +1,49 @@
+"""
+Compare building the clustering input matrix with df.apply(pd.Series) against
+ClusteringService._get_np_embeddings.
+
+Usage:
+    python -m benchmarks.embedding_matrix --sizes 1000 10000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import pandas as pd
+from app.services.clustering import ClusteringService
+from .synthetic import make_articles_df, make_corpus
+
+def legacy_matrix(df: pd.DataFrame):
+    return df["embeddings"].apply(pd.Series).values
+
+def measure(build, df: pd.DataFrame) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    matrix = build(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(elapsed, 4),
+        "peak_mb": round(peak / 2**20, 1),
+        "matrix_mb": round(matrix.nbytes / 2**20, 1),
+        "dtype": str(matrix.dtype)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--skip-legacy", action="store_true", help="Only measure the current path")
+    args = parser.parse_args()
+
+    service = ClusteringService()
+    for size in args.sizes:
+        embeddings, _ = make_corpus(size, n_clusters=max(size // 50, 2))
+        df = make_articles_df(embeddings)
+        result = {"articles": size, "current": measure(service._get_np_embeddings, df)}
+        if not args.skip_legacy:
+            result["legacy"] = measure(legacy_matrix, df)
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure the logging cost a request pays on the event loop: the previous setup
+(JSON formatting with uuid4/utcnow per record in the calling thread) against the
+queued pipeline, with and without INFO sampling.
+
+Records are written to os.devnull, so only formatting and handler overhead count.
+"caller_us" is the time spent in logger calls per request; "drain_seconds" is how
+long the listener needed afterwards to write what was queued.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 20000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from app.utils.logger import CustomJsonFormatter, QueuedLogging, RequestContextFilter, request_id_var
+
+JSON_FORMAT = '%(timestamp)s %(level)s %(name)s %(request_id)s %(message)s'
+LOG_LINES_PER_REQUEST = 4
+
+class LegacyJsonFormatter(CustomJsonFormatter):
+    """The formatter as it was before the queued pipeline."""
+
+    def add_fields(self, log_record, record, message_dict):
+        super().add_fields(log_record, record, message_dict)
+        log_record['timestamp'] = datetime.utcnow().isoformat()
+        if not log_record.get('request_id'):
+            log_record['request_id'] = str(uuid.uuid4())
+
+def devnull_handler(formatter: logging.Formatter) -> logging.Handler:
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(formatter)
+    return handler
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"benchmark.{name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def simulate_requests(logger: logging.Logger, requests: int) -> float:
+    """Log the lines of a typical ingestion request, requests times; return seconds spent."""
+    start = time.perf_counter()
+    for i in range(requests):
+        request_id = str(i)
+        request_id_var.set(request_id)
+        logger.info("Request started", extra={'path': '/api/ingest-article'})
+        logger.info("Processing article request", extra={'article_title': 'Some title'})
+        logger.info("Embedded documents", extra={'total': 1, 'cache_hits': 0})
+        logger.info("Article processed successfully", extra={'article_title': 'Some title'})
+    return time.perf_counter() - start
+
+def run(name: str, requests: int, sample_rate: float = 1.0, queued: bool = True) -> dict:
+    if queued:
+        pipeline = QueuedLogging([devnull_handler(CustomJsonFormatter(JSON_FORMAT))], sample_rate=sample_rate)
+        pipeline.start()
+        logger = make_logger(name, pipeline.handler)
+    else:
+        handler = devnull_handler(LegacyJsonFormatter(JSON_FORMAT))
+        handler.addFilter(RequestContextFilter())
+        logger = make_logger(name, handler)
+
+    caller_seconds = simulate_requests(logger, requests)
+    drain_start = time.perf_counter()
+    if queued:
+        pipeline.stop()
+    return {
+        "pipeline": name,
+        "requests": requests,
+        "log_lines": requests * LOG_LINES_PER_REQUEST,
+        "caller_us": round(caller_seconds / requests * 1e6, 2),
+        "drain_seconds": round(time.perf_counter() - drain_start, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="INFO sample rate of the sampled run")
+    args = parser.parse_args()
+
+    print(json.dumps(run("legacy_sync", args.requests, queued=False)))
+    print(json.dumps(run("queued", args.requests)))
+    print(json.dumps(run(f"queued_sampled_{args.sample_rate}", args.requests, sample_rate=args.sample_rate)))
+
+if __name__ == "__main__":
+    main()
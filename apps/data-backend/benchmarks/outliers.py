@@ -0,0 +1,83 @@
+"""
+Compare the single-pass outlier reassignment in ClusteringService._fix_outliers
+against the previous DataFrame-based two-pass implementation.
+
+Labels mimic HDBSCAN output: ground-truth clusters with a share of points marked
+as outliers and some clusters shrunk below the minimum size.
+
+Usage:
+    python -m benchmarks.outliers --sizes 10000 50000 --dimensions 2
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsClassifier
+from app.services.clustering import ClusteringService
+from .synthetic import make_corpus
+
+def legacy_fix_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    """The DataFrame-based implementation this benchmark compares against."""
+    def get_np_embeddings(df):
+        return df["embeddings"].apply(pd.Series).values
+
+    def fix_outliers_(df):
+        outliers = df[df['cluster'] == -1]
+        if not outliers.empty:
+            knn = KNeighborsClassifier(n_neighbors=3)
+            known_points = get_np_embeddings(df[df['cluster'] != -1])
+            known_labels = df[df['cluster'] != -1]['cluster']
+            knn.fit(known_points, known_labels)
+            df.loc[df['cluster'] == -1, 'cluster'] = knn.predict(get_np_embeddings(outliers))
+        return df
+
+    df = fix_outliers_(df)
+    cluster_counts = df['cluster'].value_counts()
+    categories_less_than_3 = cluster_counts[cluster_counts < 3].index.tolist()
+    df["cluster"] = df["cluster"].apply(lambda x: -1 if x in categories_less_than_3 else x)
+    return fix_outliers_(df)
+
+def make_labels(truth: np.ndarray, outlier_share: float, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    labels = truth.copy()
+    labels[rng.random(labels.size) < outlier_share] = -1
+    # Shrink every tenth cluster to two members so the small-cluster path is exercised
+    for cluster in np.unique(truth)[::10]:
+        members = np.flatnonzero(labels == cluster)
+        labels[members[2:]] = -1
+    return labels
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, round(time.perf_counter() - start, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dimensions", type=int, default=2, help="Dimensions of the reduced embeddings")
+    parser.add_argument("--outlier-share", type=float, default=0.2)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    service = ClusteringService()
+    for size in args.sizes:
+        embeddings, truth = make_corpus(size, n_clusters=max(size // 50, 2), dimensions=args.dimensions)
+        labels = make_labels(truth, args.outlier_share)
+        fixed, seconds = timed(lambda: service._fix_outliers(labels, embeddings))
+        result = {
+            "articles": size,
+            "dimensions": args.dimensions,
+            "current_seconds": seconds,
+            "current_clusters": int(np.unique(fixed).size)
+        }
+        if not args.skip_legacy:
+            df = pd.DataFrame({"embeddings": list(embeddings), "cluster": labels})
+            legacy, seconds = timed(lambda: legacy_fix_outliers(df))
+            result["legacy_seconds"] = seconds
+            result["legacy_clusters"] = int(legacy["cluster"].nunique())
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Compare dimensionality reducers on a synthetic corpus: stage timings, agreement
+with the reference reducer's clustering and recovery of the ground-truth clusters.
+
+Usage:
+    python -m benchmarks.reducers --articles 5000 --reducers pca:50 random_projection:256 truncate:256
+"""
+import argparse
+import json
+from app.services.clustering import ClusteringService
+from .synthetic import make_articles_df, make_corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--clusters", type=int, default=None, help="Ground-truth clusters (default articles / 20)")
+    parser.add_argument("--reference", default="umap")
+    parser.add_argument("--reducers", nargs="+", default=["pca:50", "random_projection:256", "truncate:256", "none"])
+    args = parser.parse_args()
+
+    embeddings, truth = make_corpus(args.articles, args.clusters or max(args.articles // 20, 2))
+    df = make_articles_df(embeddings)
+    service = ClusteringService()
+    for result in service.evaluate_reducers(df, args.reducers, reference=args.reference, ground_truth=truth):
+        result["articles"] = args.articles
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cold-start cost of an API worker: importing app.main, building the services as the
+lifespan does, and loading the clustering stack on first batch use.
+
+Every repeat runs in a fresh subprocess, so module caches never carry over. Each
+phase reports its wall time, the peak RSS once it finished and whether the heavy
+ML modules were loaded by then. --importtime adds the import time per top-level
+package, from python -X importtime. Results are written as JSON so runs from
+different commits can be compared.
+
+No network is used: Langfuse prompts are not preloaded and MongoDB is not contacted.
+
+Usage:
+    python -m benchmarks.startup --repeat 5 --output startup.json
+    python -m benchmarks.startup --repeat 5 --compare baseline.json
+    python -m benchmarks.startup --importtime 15
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ML_MODULES = ["pandas", "sklearn", "umap", "numba", "scipy", "joblib"]
+PHASES = ["import", "services", "clustering"]
+
+def snapshot(started: float) -> dict:
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "modules": len(sys.modules),
+        "ml_modules": [name for name in ML_MODULES if name in sys.modules]
+    }
+
+async def run_phases() -> dict:
+    """Measure every phase in the current process."""
+    started = time.perf_counter()
+    from app.main import app, init_services
+    phases = {"import": snapshot(started)}
+
+    started = time.perf_counter()
+    init_services(app)
+    phases["services"] = snapshot(started)
+
+    started = time.perf_counter()
+    digest_service = app.state.digest_service
+    digest_service.clustering_service
+    digest_service.clustering_pool
+    digest_service.cluster_state_store
+    phases["clustering"] = snapshot(started)
+    return phases
+
+def run_in_subprocess() -> dict:
+    command = [sys.executable, "-m", "benchmarks.startup", "--worker"]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1:]}
+    # Logs go to stdout too; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def import_time_by_package(top: int) -> list:
+    """Self import time of app.main summed per top-level package, slowest first."""
+    command = [sys.executable, "-X", "importtime", "-c", "import app.main"]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    totals = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "seconds": round(us / 1e6, 3)} for package, us in slowest]
+
+def summarize(runs: list) -> dict:
+    """Median wall time and peak RSS per phase over the successful runs."""
+    runs = [run for run in runs if "error" not in run]
+    return {
+        phase: {
+            "median_seconds": round(statistics.median(run[phase]["seconds"] for run in runs), 3),
+            "min_seconds": min(run[phase]["seconds"] for run in runs),
+            "median_peak_rss_mb": round(statistics.median(run[phase]["peak_rss_mb"] for run in runs), 1),
+            "ml_modules": runs[-1][phase]["ml_modules"]
+        }
+        for phase in PHASES
+    } if runs else {}
+
+def git_commit() -> str:
+    completed = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+    return completed.stdout.strip() or "unknown"
+
+def compare(summary: dict, baseline_path: str) -> None:
+    """Print the ratio of every phase's median time and peak RSS to the baseline."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["summary"]
+    for phase, current in summary.items():
+        previous = baseline.get(phase)
+        if not previous:
+            continue
+        print(json.dumps({
+            "phase": phase,
+            "ratio_to_baseline": {
+                key: round(current[key] / previous[key], 2)
+                for key in ("median_seconds", "median_peak_rss_mb")
+                if previous.get(key)
+            }
+        }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Also print the N slowest top-level packages imported by app.main")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_phases())))
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        run = run_in_subprocess()
+        print(json.dumps(run))
+        runs.append(run)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": runs,
+        "summary": summarize(runs)
+    }
+    print(json.dumps({"summary": report["summary"]}))
+
+    if args.importtime:
+        report["import_time_by_package"] = import_time_by_package(args.importtime)
+        for entry in report["import_time_by_package"]:
+            print(json.dumps(entry))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        compare(report["summary"], args.compare)
+
+if __name__ == "__main__":
+    main()
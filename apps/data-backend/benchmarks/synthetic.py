@@ -0,0 +1,44 @@
+"""Synthetic clustered embedding corpora for offline benchmarks."""
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+EMBEDDING_DIMENSIONS = 3072
+
+def make_corpus(n_articles: int, n_clusters: int, dimensions: int = EMBEDDING_DIMENSIONS,
+                noise: float = 0.35, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generate unit-norm embeddings scattered around n_clusters random topic centres.
+
+    Returns:
+        (embeddings, labels) where embeddings is a float32 matrix of shape
+        (n_articles, dimensions) and labels holds the ground-truth cluster per row
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dimensions), dtype=np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+
+    labels = rng.integers(0, n_clusters, size=n_articles)
+    embeddings = np.empty((n_articles, dimensions), dtype=np.float32)
+    # Fill in chunks so peak memory stays close to the size of the result
+    for start in range(0, n_articles, 10000):
+        chunk = embeddings[start:start + 10000]
+        rng.standard_normal(chunk.shape, dtype=np.float32, out=chunk)
+        chunk *= noise / np.sqrt(dimensions)
+        chunk += centres[labels[start:start + 10000]]
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+    return embeddings, labels
+
+def make_articles_df(embeddings: np.ndarray) -> pd.DataFrame:
+    """Wrap embeddings in a DataFrame shaped like DigestService.get_latest_articles output."""
+    n_articles = embeddings.shape[0]
+    return pd.DataFrame({
+        "_id": [f"article-{i}" for i in range(n_articles)],
+        "url": [f"https://example.com/{i}" for i in range(n_articles)],
+        "title": [f"Article {i}" for i in range(n_articles)],
+        "summary": ["Summary"] * n_articles,
+        "image": [""] * n_articles,
+        # Mongo returns embeddings as lists of Python floats
+        "embeddings": embeddings.astype(np.float64).tolist(),
+        "version": 0
+    })
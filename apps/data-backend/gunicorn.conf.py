@@ -0,0 +1,19 @@
+"""
+Gunicorn settings. Gunicorn reads ./gunicorn.conf.py from its working directory, so
+the Docker image picks this file up without a --config flag.
+"""
+import os
+import shutil
+
+def on_starting(server):
+    """Start with an empty Prometheus multiprocess directory, so no stale worker files are read."""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    """Remove an exited worker's live gauge values from the Prometheus multiprocess files."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,168 @@
+"""
+Check that the hot MongoDB queries are served by indexes.
+
+Each query is explained (queryPlanner verbosity, nothing is executed) and its
+winning plan is checked for a collection scan, and for a blocking sort where the
+query sorts. One JSON line is printed per query; the exit status is 1 when any
+query is not served by an index.
+
+Usage (from apps/data-backend):
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --ensure-indexes
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from app.services.mongodb import MongoDBService, mongo_connection
+
+# Stages that read through an index (IDHACK and EXPRESS_* are _id and unique-key lookups)
+INDEX_STAGES = {"IXSCAN", "COUNT_SCAN", "DISTINCT_SCAN", "IDHACK", "EXPRESS_IXSCAN", "EXPRESS_IDHACK"}
+
+def hot_queries() -> List[Dict[str, Any]]:
+    """The queries of the batch digest and daily digest paths, as explain commands."""
+    end = datetime.utcnow()
+    window = {"createdAt": {"$gte": end - timedelta(hours=24), "$lte": end}}
+    version = int(end.timestamp() * 1000)
+    return [
+        {
+            "name": "article_window",
+            "collection": "articles",
+            "command": {"aggregate": "articles", "pipeline": [{"$match": window}], "cursor": {}}
+        },
+        {
+            "name": "count_articles",
+            "collection": "articles",
+            "command": {"count": "articles", "query": window}
+        },
+        {
+            "name": "articles_by_topic",
+            "collection": "articles",
+            "command": {"find": "articles", "filter": {"topics": "climate"}, "limit": 10}
+        },
+        {
+            "name": "latest_digest_version",
+            "collection": "digest_runs",
+            "sorted": True,
+            "command": {
+                "find": "digest_runs",
+                "filter": {"status": "completed"},
+                "projection": {"version": 1, "_id": 0},
+                "sort": {"version": -1},
+                "limit": 1
+            }
+        },
+        {
+            "name": "digest_status",
+            "collection": "digests",
+            "command": {
+                "aggregate": "digests",
+                "pipeline": [
+                    {"$match": {"version": version}},
+                    {"$group": {"_id": None, "first_created": {"$min": "$createdAt"}}}
+                ],
+                "cursor": {}
+            }
+        },
+        {
+            "name": "cluster_digests",
+            "collection": "digests",
+            "command": {"find": "digests", "filter": {"version": version, "cluster": {"$in": ["0", "1"]}}}
+        },
+        {
+            "name": "previous_digest_run",
+            "collection": "digest_runs",
+            "sorted": True,
+            "command": {
+                "find": "digest_runs",
+                "filter": {"version": {"$lt": version}, "status": {"$in": ["completed", "incomplete"]}},
+                "sort": {"version": -1},
+                "limit": 1
+            }
+        },
+        {
+            "name": "reader_digests",
+            "collection": "reader_digests",
+            "command": {"find": "reader_digests", "filter": {"readerId": "reader", "version": version}, "limit": 1}
+        },
+        {
+            "name": "digest_timing",
+            "collection": "digest_timings",
+            "sorted": True,
+            "command": {
+                "find": "digest_timings",
+                "filter": {"version": version},
+                "sort": {"createdAt": -1},
+                "limit": 1
+            }
+        }
+    ]
+
+def find_winning_plans(explain: Any) -> List[Dict[str, Any]]:
+    """Every winningPlan of an explain output, wherever the server nests it."""
+    plans = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                # Slot-based engine plans keep the classic plan tree under queryPlan
+                plans.append(value.get("queryPlan", value))
+            else:
+                plans.extend(find_winning_plans(value))
+    elif isinstance(explain, list):
+        for value in explain:
+            plans.extend(find_winning_plans(value))
+    return plans
+
+def plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stages = [plan]
+    for key in ("inputStage", "inputStages"):
+        children = plan.get(key) or []
+        for child in children if isinstance(children, list) else [children]:
+            stages.extend(plan_stages(child))
+    return stages
+
+async def check(mongodb: MongoDBService, query: Dict[str, Any]) -> Dict[str, Any]:
+    explain = await mongodb.db.command({"explain": query["command"], "verbosity": "queryPlanner"})
+    stages = [stage for plan in find_winning_plans(explain) for stage in plan_stages(plan)]
+    names = [stage["stage"] for stage in stages if "stage" in stage]
+    indexes = sorted({stage["indexName"] for stage in stages if stage.get("indexName")})
+
+    problems = []
+    if not stages:
+        problems.append("no winning plan in explain output")
+    elif names == ["EOF"]:
+        # The planner skips planning for a collection that does not exist yet
+        problems.append("collection does not exist")
+    elif "COLLSCAN" in names or not INDEX_STAGES & set(names):
+        problems.append("collection scan")
+    if query.get("sorted") and "SORT" in names:
+        problems.append("blocking sort")
+    return {
+        "query": query["name"],
+        "collection": query["collection"],
+        "stages": names,
+        "indexes": indexes,
+        "ok": not problems,
+        "problems": problems
+    }
+
+async def main(ensure_indexes: bool) -> int:
+    mongodb = MongoDBService()
+    try:
+        if ensure_indexes:
+            await mongodb.ensure_indexes()
+        results = [await check(mongodb, query) for query in hot_queries()]
+    finally:
+        mongo_connection.close()
+
+    for result in results:
+        print(json.dumps(result))
+    return 0 if all(result["ok"] for result in results) else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ensure-indexes", action="store_true", help="Create missing indexes before checking")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.ensure_indexes)))
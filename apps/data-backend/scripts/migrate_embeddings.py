@@ -0,0 +1,24 @@
+"""
+Convert embeddings stored as BSON arrays into packed float32 binary.
+
+Usage (from apps/data-backend):
+    python -m scripts.migrate_embeddings --collection digests
+"""
+import argparse
+import asyncio
+from app.services.mongodb import MongoDBService, mongo_connection
+
+async def main(collection: str, batch_size: int) -> None:
+    mongodb = MongoDBService()
+    try:
+        migrated = await mongodb.migrate_embeddings(collection, batch_size)
+        print(f"Migrated {migrated} documents in {collection}")
+    finally:
+        mongo_connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="digests")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.collection, args.batch_size))
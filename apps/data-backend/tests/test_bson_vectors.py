@@ -0,0 +1,25 @@
+import numpy as np
+from bson.binary import Binary
+from app.utils.bson_vectors import FLOAT32_HEADER, VECTOR_SUBTYPE, decode_vector, encode_float32_vector, is_float32_vector
+
+def test_decode_vector_round_trips_packed_float32():
+    vector = [0.1, -2.5, 3.0]
+    encoded = encode_float32_vector(vector)
+
+    assert is_float32_vector(encoded)
+    decoded = decode_vector(encoded)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, np.asarray(vector, dtype=np.float32))
+
+def test_decode_vector_converts_legacy_arrays():
+    decoded = decode_vector([0.1, 0.2])
+
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, np.asarray([0.1, 0.2], dtype=np.float32))
+
+def test_decode_vector_does_not_read_other_binaries_as_vectors():
+    assert not is_float32_vector(Binary(b'\x10\x00' + b'\x00' * 8, VECTOR_SUBTYPE))
+    assert not is_float32_vector(Binary(FLOAT32_HEADER + b'\x00' * 8, 0))
+
+def test_decode_vector_of_an_empty_vector():
+    assert decode_vector(encode_float32_vector([])).size == 0
@@ -0,0 +1,41 @@
+import numpy as np
+from app.services.clustering import ClusteringService
+
+def test_fix_outliers_places_all_points_in_one_cluster_when_none_found():
+    labels = np.array([-1, -1, -1, -1])
+    embeddings = np.random.default_rng(0).normal(size=(4, 3)).astype(np.float32)
+
+    fixed = ClusteringService()._fix_outliers(labels, embeddings)
+
+    assert fixed.tolist() == [0, 0, 0, 0]
+
+def test_fix_outliers_assigns_everything_to_a_single_cluster():
+    labels = np.array([2, 2, 2, -1, -1])
+    embeddings = np.random.default_rng(0).normal(size=(5, 3)).astype(np.float32)
+
+    fixed = ClusteringService()._fix_outliers(labels, embeddings)
+
+    assert fixed.tolist() == [2, 2, 2, 2, 2]
+
+def test_fix_outliers_reassigns_to_the_nearest_kept_cluster():
+    embeddings = np.array([
+        [0.0, 0.0], [0.1, 0.0], [0.0, 0.1],
+        [10.0, 10.0], [10.1, 10.0], [10.0, 10.1],
+        [0.05, 0.05], [10.05, 10.05], [9.9, 9.9]
+    ], dtype=np.float32)
+    # The last two points form a cluster below MIN_CLUSTER_ITEMS and are dissolved
+    labels = np.array([0, 0, 0, 1, 1, 1, -1, 2, 2])
+
+    fixed = ClusteringService()._fix_outliers(labels, embeddings)
+
+    assert fixed.tolist() == [0, 0, 0, 1, 1, 1, 0, 1, 1]
+    assert labels.tolist() == [0, 0, 0, 1, 1, 1, -1, 2, 2]
+
+def test_fix_outliers_keeps_small_clusters_when_none_is_large_enough():
+    labels = np.array([0, 0, 1, 1, -1])
+    embeddings = np.array([[0.0], [0.1], [5.0], [5.1], [4.9]], dtype=np.float32)
+
+    fixed = ClusteringService()._fix_outliers(labels, embeddings)
+
+    assert fixed.tolist()[:4] == [0, 0, 1, 1]
+    assert fixed[4] == 1
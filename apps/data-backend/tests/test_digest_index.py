@@ -0,0 +1,29 @@
+import numpy as np
+from app.services.digest_index import DigestIndex
+
+def make_index(matrix, digest_ids):
+    index = DigestIndex(mongodb=None)
+    index.matrix = np.asarray(matrix, dtype=np.float32)
+    index.digest_ids = digest_ids
+    return index
+
+def test_search_many_ranks_every_query_best_first():
+    index = make_index([[1, 0, 0], [0, 1, 0], [0, 0, 1], [0.7, 0.7, 0]], ['x', 'y', 'z', 'xy'])
+    queries = np.array([[1, 0.1, 0], [0, 0.2, 1]], dtype=np.float32)
+
+    assert index.search_many(queries, 2) == [['x', 'xy'], ['z', 'y']]
+
+def test_search_many_returns_at_most_every_digest():
+    index = make_index([[1, 0], [0, 1]], ['x', 'y'])
+
+    assert index.search_many(np.array([[0, 1]], dtype=np.float32), 10) == [['y', 'x']]
+
+def test_search_many_on_an_empty_index_returns_one_empty_list_per_query():
+    index = DigestIndex(mongodb=None)
+
+    assert index.search_many(np.ones((3, 4), dtype=np.float32), 5) == [[], [], []]
+
+def test_search_matches_search_many():
+    index = make_index([[1, 0], [0, 1], [0.6, 0.8]], ['x', 'y', 'xy'])
+
+    assert index.search([0.5, 1.0], 2) == index.search_many(np.array([[0.5, 1.0]]), 2)[0]
@@ -0,0 +1,36 @@
+from app.services.digest import DigestService
+
+def entry(article_ids):
+    return {'articleIds': article_ids, 'membershipHash': DigestService._membership_hash(article_ids)}
+
+def test_membership_hash_ignores_order():
+    assert DigestService._membership_hash(['a', 'b', 'c']) == DigestService._membership_hash(['c', 'a', 'b'])
+    assert DigestService._membership_hash(['a', 'b']) != DigestService._membership_hash(['a', 'b', 'c'])
+
+def test_match_clusters_pairs_identical_members_only_at_threshold_one():
+    current = {'0': entry(['a', 'b', 'c']), '1': entry(['d', 'e', 'f'])}
+    previous = {'5': entry(['c', 'b', 'a']), '6': entry(['d', 'e', 'x'])}
+
+    assert DigestService._match_clusters(current, previous, 1.0) == {'0': '5'}
+
+def test_match_clusters_falls_back_to_jaccard_similarity():
+    current = {'0': entry(['a', 'b', 'c']), '1': entry(['d', 'e', 'f', 'g'])}
+    previous = {'5': entry(['a', 'b', 'c']), '6': entry(['d', 'e', 'f', 'x'])}
+
+    # Cluster 1 shares 3 of 5 distinct members with cluster 6
+    assert DigestService._match_clusters(current, previous, 0.6) == {'0': '5', '1': '6'}
+    assert DigestService._match_clusters(current, previous, 0.7) == {'0': '5'}
+
+def test_match_clusters_uses_each_previous_cluster_once():
+    current = {'0': entry(['a', 'b', 'c', 'd']), '1': entry(['a', 'b', 'c', 'e'])}
+    previous = {'5': entry(['a', 'b', 'c'])}
+
+    matches = DigestService._match_clusters(current, previous, 0.5)
+
+    assert list(matches.values()) == ['5']
+
+def test_match_clusters_hashes_previous_entries_without_a_stored_hash():
+    current = {'0': entry(['a', 'b'])}
+    previous = {'5': {'articleIds': ['b', 'a']}}
+
+    assert DigestService._match_clusters(current, previous, 1.0) == {'0': '5'}
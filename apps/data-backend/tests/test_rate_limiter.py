@@ -0,0 +1,24 @@
+import asyncio
+from app.services.rate_limiter import TokenBucket
+
+def test_token_bucket_serves_a_full_bucket_without_waiting():
+    bucket = TokenBucket(600)
+
+    assert asyncio.run(bucket.acquire(600)) == 0.0
+
+def test_token_bucket_waits_for_the_refill():
+    async def drain_and_acquire():
+        # 60000 per minute refills 1000 units per second
+        bucket = TokenBucket(60000)
+        await bucket.acquire(60000)
+        return await bucket.acquire(100)
+
+    waited = asyncio.run(drain_and_acquire())
+
+    assert 0.05 < waited < 0.2
+
+def test_token_bucket_caps_requests_larger_than_the_bucket():
+    bucket = TokenBucket(60)
+
+    assert asyncio.run(bucket.acquire(1000)) == 0.0
+    assert bucket.tokens < 1
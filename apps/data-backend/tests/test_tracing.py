@@ -0,0 +1,38 @@
+from app.utils.tracing import span, start_trace
+
+def run_trace(clusters):
+    trace = start_trace("batch_digest", mode="full")
+    try:
+        for cluster in range(clusters):
+            with span("process_cluster_job", cluster=cluster):
+                with span("llm"):
+                    pass
+    finally:
+        trace.close()
+    return trace
+
+def test_report_bounds_the_critical_path_and_slowest_clusters():
+    report = run_trace(50).report(slowest=5, critical_path_limit=10)
+
+    assert len(report['critical_path']) == 10
+    # Each cluster job and its llm call are on the path
+    assert report['critical_path_truncated'] == 90
+    assert len(report['slowest_clusters']) == 5
+    assert report['clusters']['count'] == 50
+    assert report['spans']['llm']['count'] == 50
+
+def test_report_lists_the_slowest_clusters_first():
+    report = run_trace(20).report(slowest=3)
+
+    seconds = [entry['seconds'] for entry in report['slowest_clusters']]
+    assert seconds == sorted(seconds, reverse=True)
+    assert report['clusters']['max_seconds'] == seconds[0]
+
+def test_report_without_clusters():
+    report = run_trace(0).report()
+
+    assert report['critical_path'] == []
+    assert report['critical_path_truncated'] == 0
+    assert report['clusters']['count'] == 0
+    assert report['clusters']['max_seconds'] == 0.0
+    assert report['slowest_clusters'] == []